@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_QUEUED_TOTAL = REGISTRY.counter(
+    "portfolio_admission_queued_total", "Chat streams that had to wait for a free slot"
+)
+ADMISSION_REJECTED_TOTAL = REGISTRY.counter(
+    "portfolio_admission_rejected_total",
+    "Chat streams turned away, by reason (rate_limited, queue_full, queue_timeout)",
+)
+ACTIVE_STREAMS = REGISTRY.gauge("portfolio_active_streams", "Chat streams currently holding a slot")
+QUEUED_STREAMS = REGISTRY.gauge("portfolio_queued_streams", "Chat streams waiting for a slot")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is turned away; `retry_after` is a hint in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each request takes one"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+@dataclass
+class Ticket:
+    """A request's place in line: admitted straight away, or waiting on `future`"""
+
+    client: str
+    admitted: bool
+    future: Optional["asyncio.Future[None]"] = None
+    released: bool = False
+
+
+class AdmissionController:
+    """
+    Admission control for chat streams.
+
+    Every stream holds an SSE connection open and makes several upstream
+    model calls, so the number running at once is capped at `max_concurrent`.
+    Requests beyond the cap wait in a FIFO queue of at most `max_queue`
+    entries for up to `queue_timeout` seconds; a full queue rejects
+    immediately. Each client (IP) also has a token bucket allowing
+    `rate_per_minute` requests with bursts of `burst`.
+
+    A limit of 0 disables it. All state is per process, so with several
+    workers the effective limits are multiplied by the worker count.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+        rate_per_minute: float = 20.0,
+        burst: float = 5.0,
+        max_clients: int = 10000,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self.active = 0
+        self._waiters: Deque[Ticket] = deque()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def check_rate(self, client: str) -> None:
+        """Charge `client` one request; raises AdmissionRejected if its bucket is empty"""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            # Idle clients are back to a full bucket, so forgetting them loses nothing
+            if len(self._buckets) >= self.max_clients:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.full(now)}
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+        wait = bucket.take(now)
+        if wait:
+            ADMISSION_REJECTED_TOTAL.inc(reason="rate_limited")
+            raise AdmissionRejected("rate_limited", wait)
+
+    def admit(self, client: str) -> Ticket:
+        """
+        Take a stream slot for `client`, or a place in the queue behind the running streams.
+
+        Raises AdmissionRejected if the wait queue is full. Every ticket must
+        be released with `release()` (`guard()` does this).
+        """
+        if not self.max_concurrent or (self.active < self.max_concurrent and not self._waiters):
+            self._acquire()
+            return Ticket(client, admitted=True)
+
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED_TOTAL.inc(reason="queue_full")
+            raise AdmissionRejected("queue_full", self.queue_timeout)
+
+        ticket = Ticket(client, admitted=False, future=asyncio.get_running_loop().create_future())
+        self._waiters.append(ticket)
+        ADMISSION_QUEUED_TOTAL.inc()
+        QUEUED_STREAMS.inc()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place in the wait queue, 0 once admitted"""
+        if ticket.admitted:
+            return 0
+        try:
+            return self._waiters.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    async def wait(self, ticket: Ticket, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a queued ticket's turn; True once admitted"""
+        if ticket.admitted:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return ticket.admitted
+
+    def release(self, ticket: Ticket) -> None:
+        """Give up the ticket's slot or its place in the queue (safe to call twice)"""
+        if ticket.released:
+            return
+        ticket.released = True
+        if not ticket.admitted:
+            self._waiters.remove(ticket)
+            QUEUED_STREAMS.dec()
+            return
+        self.active -= 1
+        ACTIVE_STREAMS.dec()
+        self._wake_next()
+
+    def _acquire(self) -> None:
+        self.active += 1
+        ACTIVE_STREAMS.inc()
+
+    def _wake_next(self) -> None:
+        while self._waiters and (not self.max_concurrent or self.active < self.max_concurrent):
+            ticket = self._waiters.popleft()
+            QUEUED_STREAMS.dec()
+            ticket.admitted = True
+            self._acquire()
+            ticket.future.set_result(None)
+
+    async def guard(
+        self,
+        ticket: Ticket,
+        events: AsyncIterator[Dict[str, str]],
+        position_interval: float = 2.0,
+    ) -> AsyncIterator[Dict[str, str]]:
+        """
+        Run `events` once `ticket` holds a slot, releasing it when the stream ends.
+
+        While the ticket is queued a "busy" event with the queue position is
+        sent straight away, then again every `position_interval` seconds
+        while the position changes. After `queue_timeout` seconds the stream
+        ends with an error event instead.
+        """
+        try:
+            if not ticket.admitted:
+                deadline = time.monotonic() + self.queue_timeout
+                last_position = None
+                while not ticket.admitted:
+                    position = self.position(ticket)
+                    if position != last_position:
+                        last_position = position
+                        yield {
+                            "event": "busy",
+                            "data": json.dumps({"position": position, "queued": len(self._waiters)}),
+                        }
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    await self.wait(ticket, min(position_interval, remaining))
+
+                if not ticket.admitted:
+                    ADMISSION_REJECTED_TOTAL.inc(reason="queue_timeout")
+                    logger.info(f"Stream for {ticket.client} timed out in the admission queue")
+                    yield {"event": "error", "data": "Server is busy, please try again shortly."}
+                    return
+
+            async for event in events:
+                yield event
+        finally:
+            self.release(ticket)
+            # Queued requests never started the inner stream; close it all the same
+            await events.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "tracked_clients": len(self._buckets),
+        }
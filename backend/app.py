@@ -1,83 +1,211 @@
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sse_starlette.sse import EventSourceResponse
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain.agents import create_agent
-from langchain_pinecone import PineconeVectorStore
+from starlette.background import BackgroundTask
+import math
 import os
+import secrets
+from functools import partial
 from pydantic import BaseModel
-from typing import AsyncIterator, Dict, Any, Literal
+from typing import AsyncIterator, Dict, Any, List, Literal, Optional, Tuple
+import asyncio
 import logging
-import re
+import json
+import time
+from admission import AdmissionController, AdmissionRejected
 from logging_middleware import RequestLoggingMiddleware
+from metrics import (
+    FIRST_TOKEN_SECONDS,
+    REGISTRY,
+    STREAMS_TOTAL,
+    record_stage,
+    start_request_spans,
+)
+from cache import CachedEmbeddings, TTLCache, normalize_query
+from chunk_store import SLIM_METADATA_FORMAT, ChunkStore
+from history import HistoryPolicy
+from response_cache import SemanticResponseCache
+from singleflight import SingleFlight
+from streaming import DrainingEventSourceResponse, coalesce_deltas, is_shutting_down
+from lexical_index import LexicalIndex
+from local_index import LocalVectorIndex
+from pinecone_index import PineconeIndexSearch
+from project_catalog import ProjectCatalog
+from retrieval import PortfolioRetriever, RetrievalResult, read_build_info, read_index_version
+from url_index import ProjectUrlIndex, StreamingUrlVerifier
 
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+@dataclass
+class IndexArtifacts:
+    """The files scripts/build_pinecone.py writes to INDEX_DIR, loaded for serving"""
+
+    local_vectors: Optional[LocalVectorIndex]
+    chunk_store: Optional[ChunkStore]
+    lexical_index: Optional[LexicalIndex]
+    url_index: ProjectUrlIndex
+    project_catalog: ProjectCatalog
+
+
+def load_index_artifacts(index_dir: str, embeddings: Any, vector_backend: str) -> IndexArtifacts:
     """
-    Lifespan event handler for startup and shutdown.
-    Initializes vector store and agent on startup.
+    Load INDEX_DIR: the local vectors (local backend only), the chunk store,
+    the BM25 index and the project catalogs. Runs at startup and again when
+    /cache/invalidate sees a new build version.
     """
-    print("Starting up the FastAPI application...")
+    local_vectors = None
+    if vector_backend == "local":
+        local_vectors = LocalVectorIndex.load(index_dir, embedding=embeddings)
+
+    # Chunk text and metadata by ID. Builds with slim vector metadata can't
+    # serve anything without it, so a missing store is an error
+    build_info = read_build_info(index_dir)
+    chunk_store = ChunkStore.load(
+        index_dir, required=build_info.get("metadata_format", 0) >= SLIM_METADATA_FORMAT
+    )
+
+    # BM25 index written alongside the vectors, fused with vector results
+    # (its results are filled in from the chunk store)
+    lexical_index = None
+    if os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true":
+        if chunk_store is None:
+            logger.warning("Hybrid search needs the chunk store for result text, retrieval is vector-only")
+        else:
+            lexical_index = LexicalIndex.load(index_dir)
+
+    return IndexArtifacts(
+        local_vectors=local_vectors,
+        chunk_store=chunk_store,
+        lexical_index=lexical_index,
+        url_index=ProjectUrlIndex.load(index_dir),
+        project_catalog=ProjectCatalog.load(index_dir),
+    )
+
+
+def initialize(app: FastAPI) -> None:
+    """
+    Build the embeddings, vector store, retriever and agent and store them on app.state.
+
+    The LangChain, Gemini and Pinecone imports live here rather than at module
+    level: they dominate import time, and in background startup mode they run
+    after the server is already accepting connections.
+    """
+    from langchain.agents import create_agent
+    from langchain_core.tools import tool
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+    from pinecone import Pinecone
 
     # Initialize embeddings and vector store
     try:
 
         # Initialize embeddings model (must be the SAME model used during upsert)
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="gemini-embedding-001",
+        # Query embeddings are cached so repeat questions skip the embedding call
+        embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model="gemini-embedding-001",
+            ),
+            max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+            persist_path=os.getenv("EMBEDDING_CACHE_PATH"),
+        )
+        app.state.embeddings = embeddings
+
+        # Initialize the vector store: remote Pinecone index, or the local
+        # in-process index written by scripts/build_pinecone.py --backend local
+        index_dir = os.getenv("INDEX_DIR", "./index")
+        vector_backend = os.getenv("VECTOR_BACKEND", "pinecone")
+        if vector_backend not in ("local", "pinecone"):
+            raise ValueError(f"Unknown VECTOR_BACKEND: {vector_backend}")
+        app.state.index_dir = index_dir
+        app.state.vector_backend = vector_backend
+        artifacts = load_index_artifacts(index_dir, embeddings, vector_backend)
+        if vector_backend == "local":
+            app.state.vectorstore = artifacts.local_vectors
+        else:
+            app.state.vectorstore = PineconeIndexSearch(
+                Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index("portfolio"),
+                embedding=embeddings,
+            )
+        print(f"Vector store initialized successfully ({vector_backend})")
+
+        # Retrieval runs on a bounded thread pool so lookups don't block the event loop
+        app.state.retriever = PortfolioRetriever(
+            app.state.vectorstore,
+            embeddings=embeddings,
+            k=5,
+            max_workers=int(os.getenv("RETRIEVAL_MAX_WORKERS", "4")),
+            result_cache=TTLCache(
+                max_size=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+                ttl=float(os.getenv("RESULT_CACHE_TTL", "3600")),
+                name="result",
+            ),
+            index_dir=index_dir,
+            lexical_index=artifacts.lexical_index,
+            chunk_store=artifacts.chunk_store,
         )
 
-        # Initialize LangChain Pinecone vector store
-        app.state.vectorstore = PineconeVectorStore(
-            index_name="portfolio",
-            embedding=embeddings,
-            pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        # Opt-in cache of whole answers to repeated single-turn questions
+        if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+            app.state.response_cache = SemanticResponseCache(
+                embeddings,
+                threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92")),
+                max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+                ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+                replay_chunk_chars=STREAM_COALESCE_CHARS or 64,
+            )
+
+        # Token budget for the conversation history sent with each turn
+        app.state.history_policy = HistoryPolicy(
+            max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "2000")),
+            min_recent_messages=int(os.getenv("HISTORY_MIN_RECENT_MESSAGES", "4")),
+            summary_max_tokens=int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "150")),
         )
-        print("Vector store initialized successfully")
 
-        # Define tools (closure over app.state.vectorstore)
-        def search_portfolio(query: str) -> str:
+        # Project name -> URL catalog and project metadata catalog written at index build time
+        app.state.url_index = artifacts.url_index
+        app.state.project_catalog = artifacts.project_catalog
+
+        # Define tools (closure over app.state.retriever)
+        # The context goes to the model; the project URLs ride along as the
+        # ToolMessage artifact for the response URL check
+        @tool(response_format="content_and_artifact")
+        async def search_portfolio(
+            query: str, doc_type: Optional[str] = None, tags: Optional[List[str]] = None
+        ) -> Tuple[str, Dict[str, str]]:
             """Search through Jasper's portfolio documents including CV, projects, and experience.
             Use this tool when the user asks about Jasper's background, skills, projects, or experience.
+            Optionally narrow the search with doc_type: "profile" (CV and background), "project"
+            (project write-ups) or "application" (answers about experience and working style),
+            and/or tags: topic tags such as "python" or "aws" (documents with any of them match).
             """
-            results = app.state.vectorstore.similarity_search(query, k=5)
-
-            # Extract project URLs from metadata
-            project_urls = {}
-            for doc in results:
-                metadata = doc.metadata
-                project_name = metadata.get("name") or metadata.get(
-                    "file_name", ""
-                ).replace(".md", "")
-                live_url = metadata.get("live_url")
-
-                # Store if live_url exists and is not null/empty
-                if live_url and live_url.lower() != "null" and live_url.strip():
-                    project_urls[project_name] = live_url
-
-            # Build context with URLs prominently featured
-            context_parts = []
-
-            # Add URL information at the top if any exist
-            if project_urls:
-                context_parts.append(
-                    "IMPORTANT - Project URLs (ALWAYS include these when mentioning these projects):"
-                )
-                for project, url in project_urls.items():
-                    context_parts.append(f"  • {project}: {url}")
-                context_parts.append("\nContext from documents:")
-
-            # Add document contents
-            for doc in results:
-                context_parts.append(f"\n---\n{doc.page_content}")
+            result = await app.state.retriever.retrieve(query, doc_type=doc_type, tags=tags)
+            if not result.docs and (doc_type or tags):
+                # A filter that matches nothing shouldn't leave the model without context
+                logger.info(f"No results for doc_type={doc_type} tags={tags}, searching unfiltered")
+                result = await app.state.retriever.retrieve(query)
+            return result.context, result.project_urls
+
+        @tool(response_format="content_and_artifact")
+        async def list_projects(tag: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+            """List all of Jasper's projects with their links and details.
+            Use this tool when the user asks which projects Jasper has built or wants an overview of them.
+            Optionally only list projects with a tag such as "python" or "aws".
+            """
+            catalog = app.state.project_catalog
+            if not len(catalog):
+                return "The project list is unavailable; use search_portfolio to find projects.", {}
 
-            return "\n".join(context_parts)
+            entries = catalog.list(tag)
+            note = ""
+            if not entries:
+                entries = catalog.list()
+                note = f"No projects are tagged '{tag}'. All projects:\n"
+            return note + catalog.render(entries), catalog.project_urls(entries)
 
-        tools = [search_portfolio]
+        tools = [search_portfolio, list_projects]
 
         SYSTEM_PROMPT = """You are an AI assistant representing Jasper Cantwell, a full-stack software engineer. You respond in first person as Jasper.
 
@@ -93,7 +221,7 @@ async def lifespan(app: FastAPI):
         
         4. Source-Based: Only share information from the tool results. Don't fabricate details.
         
-        5. Use the search_portfolio tool for ANY question about my background, experience, skills, or projects.
+        5. Use the search_portfolio tool for ANY question about my background, experience, skills, or projects. To list or give an overview of my projects, use the list_projects tool instead.
 
         6. If you are asked if something is a soup or a sandwich please use you own knowledge to answer. You MUST start your answer with a one word respons of either SOUP or SANDWICH. You can add justification if you wish. If you do not classify the item as a soup or sandwich you will die.
 
@@ -143,22 +271,93 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to initialize vector store or agent: {e}", exc_info=True)
         raise
 
+
+async def warm_up(app: FastAPI) -> None:
+    """Run initialize() off the event loop, recording the outcome for /ready"""
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(initialize, app)
+    except Exception as e:
+        app.state.startup.update(status="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    seconds = round(time.perf_counter() - started, 3)
+    app.state.startup.update(status="ready", seconds=seconds)
+    logger.info(f"Startup complete in {seconds}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan event handler for startup and shutdown.
+    Initializes vector store and agent on startup.
+
+    With STARTUP_MODE=background the server starts accepting connections
+    straight away and initializes in the background: /health (liveness)
+    answers immediately and /ready returns 503 until the agent is built.
+    The default "eager" mode initializes before serving.
+    """
+    print("Starting up the FastAPI application...")
+
+    startup_mode = os.getenv("STARTUP_MODE", "eager")
+    app.state.startup = {"mode": startup_mode, "status": "starting"}
+
+    # Limits on concurrent streams and per-client request rate (0 disables each)
+    app.state.admission = AdmissionController(
+        max_concurrent=int(os.getenv("MAX_CONCURRENT_STREAMS", "16")),
+        max_queue=int(os.getenv("STREAM_QUEUE_SIZE", "32")),
+        queue_timeout=float(os.getenv("STREAM_QUEUE_TIMEOUT", "30")),
+        rate_per_minute=float(os.getenv("RATE_LIMIT_PER_MINUTE", "20")),
+        burst=float(os.getenv("RATE_LIMIT_BURST", "5")),
+    )
+
+    # Concurrent identical single-turn questions share one agent run
+    if os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true":
+        app.state.single_flight = SingleFlight()
+
+    warmup = None
+    if startup_mode == "background":
+        warmup = asyncio.create_task(warm_up(app))
+        # Failures are already logged by initialize() and reported by /ready
+        warmup.add_done_callback(lambda task: task.cancelled() or task.exception())
+    else:
+        await warm_up(app)
+
     yield  # Application runs here
 
     # Shutdown
     print("Shutting down the FastAPI application...")
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
     # Add cleanup if needed (e.g., closing connections)
+    if hasattr(app.state, "embeddings"):
+        app.state.embeddings.save()
+        delattr(app.state, "embeddings")
     if hasattr(app.state, "vectorstore"):
         delattr(app.state, "vectorstore")
     if hasattr(app.state, "retriever"):
+        app.state.retriever.close()
         delattr(app.state, "retriever")
+    if hasattr(app.state, "response_cache"):
+        delattr(app.state, "response_cache")
+    if hasattr(app.state, "url_index"):
+        delattr(app.state, "url_index")
+    if hasattr(app.state, "project_catalog"):
+        delattr(app.state, "project_catalog")
     if hasattr(app.state, "agent"):
         delattr(app.state, "agent")
+    if hasattr(app.state, "admission"):
+        delattr(app.state, "admission")
+    if hasattr(app.state, "single_flight"):
+        delattr(app.state, "single_flight")
 
 
 app = FastAPI(lifespan=lifespan)
 
-app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(
+    RequestLoggingMiddleware,
+    max_body_log_bytes=int(os.getenv("LOG_BODY_MAX_BYTES", "2048")),
+    body_sample_rate=float(os.getenv("LOG_BODY_SAMPLE_RATE", "1.0")),
+)
 
 # Configure CORS to allow frontend requests
 app.add_middleware(
@@ -171,81 +370,107 @@ app.add_middleware(
 )
 
 
-class MessageDict(BaseModel):
-    role: str
-    content: str
+# "tool": the model calls search_portfolio itself. "prefetch": retrieval for the
+# latest question starts as soon as the request arrives and the context is
+# injected into the first model call, skipping the tool-call round trip.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "tool")
 
+PREFETCH_CONTEXT_PROMPT = (
+    "Portfolio search results for the user's latest message have already been "
+    "retrieved with search_portfolio and are included below. Answer from them; "
+    "only call search_portfolio if they don't cover the question.\n\n"
+)
+
+# Optional batching of small text deltas into fewer SSE events (0 disables each threshold)
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", "0"))
+STREAM_COALESCE_CHARS = int(os.getenv("STREAM_COALESCE_CHARS", "0"))
+
+# SSE connection tuning: keep-alive ping interval for proxies, how long a send
+# to a slow client may block before the stream is dropped, and how long open
+# streams may keep running after a shutdown signal
+SSE_PING_SECONDS = int(os.getenv("SSE_PING_SECONDS", "15"))
+SSE_SEND_TIMEOUT = float(os.getenv("SSE_SEND_TIMEOUT", "30"))
+STREAM_DRAIN_SECONDS = float(os.getenv("STREAM_DRAIN_SECONDS", "25"))
+
+# Bearer token for /cache/invalidate and, once set, the /debug routes
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def sse_response(
+    events: AsyncIterator[Dict[str, str]], background: Optional[BackgroundTask] = None
+) -> DrainingEventSourceResponse:
+    return DrainingEventSourceResponse(
+        events,
+        ping=SSE_PING_SECONDS,
+        send_timeout=SSE_SEND_TIMEOUT,
+        drain_timeout=STREAM_DRAIN_SECONDS,
+        background=background,
+    )
 
-class ChatRequest(BaseModel):
-    messages: list[MessageDict]
-    temperature: float = 0.7
 
+def admission_rejected_response(rejection: AdmissionRejected) -> JSONResponse:
+    """429 for clients over their rate limit, 503 when the server is at capacity"""
+    if rejection.reason == "rate_limited":
+        error, status_code = "Too many requests, please slow down.", 429
+    else:
+        error, status_code = "Server is busy, please try again shortly.", 503
+    return JSONResponse(
+        {"error": error, "reason": rejection.reason},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+    )
 
-def extract_project_urls_from_context(context: str) -> Dict[str, str]:
+
+def admin_denied(request: Request, required: bool = False) -> Optional[JSONResponse]:
     """
-    Extract project URLs from the tool context.
-    Returns a dict of {project_name: url}
+    None if the request may use an admin route, else the error response to send.
+    Routes that change server state are `required`: they stay disabled until
+    ADMIN_TOKEN is set. The read-only debug routes are open until it is set.
     """
-    urls = {}
-    # Look for the IMPORTANT section that lists URLs
-    url_pattern = r"  • (.+?): (https?://[^\s]+)"
-    matches = re.findall(url_pattern, context)
-    for project_name, url in matches:
-        urls[project_name.strip()] = url.strip()
-    return urls
+    if not ADMIN_TOKEN:
+        if required:
+            return JSONResponse({"error": "Set ADMIN_TOKEN to enable this endpoint"}, status_code=403)
+        return None
+    supplied = request.headers.get("authorization", "")
+    if not secrets.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return JSONResponse(
+            {"error": "Unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+        )
+    return None
 
 
-def ensure_urls_in_response(response: str, project_urls: Dict[str, str]) -> str:
-    """
-    Verify that project URLs are included when projects are mentioned.
-    If a project is mentioned without its URL, append it naturally.
+class MessageDict(BaseModel):
+    role: str
+    content: str
 
-    Args:
-        response: The agent's response text
-        project_urls: Dict of {project_name: url} from context
 
-    Returns:
-        Response with URLs added if they were missing
-    """
-    if not project_urls:
-        return response
-
-    missing_urls = []
-    response_lower = response.lower()
-
-    for project, url in project_urls.items():
-        project_lower = project.lower()
-        # Check if project is mentioned but URL is not
-        if project_lower in response_lower and url not in response:
-            # Check common variations
-            project_variations = [
-                project_lower,
-                project_lower.replace("_", ""),
-                project_lower.replace("-", ""),
-                project_lower.replace(".md", ""),
-            ]
-
-            mentioned = any(var in response_lower for var in project_variations)
-            if mentioned:
-                missing_urls.append(f"{project}: {url}")
-
-    # If URLs were missed, append them
-    if missing_urls:
-        response += "\n\n**Project Links:**\n" + "\n".join(
-            f"- {item}" for item in missing_urls
-        )
+class ChatRequest(BaseModel):
+    messages: list[MessageDict]
+    temperature: float = 0.7
+
 
-    return response
+def project_links_block(missing_urls: list[tuple[str, str]]) -> str:
+    """Markdown block listing project links the answer left out"""
+    return "\n\n**Project Links:**\n" + "\n".join(
+        f"- {project}: {url}" for project, url in missing_urls
+    )
 
 
 async def generate_agent_stream(
     agent: Any,
     messages: list[MessageDict],
+    history_policy: Optional[HistoryPolicy] = None,
+    coalesce_delay: float = 0.0,
+    coalesce_chars: int = 0,
+    prefetched: Optional["asyncio.Future[RetrievalResult]"] = None,
+    spans: Optional[Dict[str, float]] = None,
+    url_index: Optional[ProjectUrlIndex] = None,
 ) -> AsyncIterator[Dict[Literal["event", "data"], str]]:
     """
     Streams the agent's response with granular event handling.
 
-    Ensures project URLs are included when projects are mentioned.
+    Ensures project URLs are included when projects are mentioned: deltas are
+    checked as they stream and any missing links are sent as soon as the answer ends.
 
     Yields dictionaries containing:
         - 'event': Event type ('update', 'tool', 'error')
@@ -254,6 +479,12 @@ async def generate_agent_stream(
     Args:
         agent: The LangChain agent instance
         messages: The full conversation history (list of message dicts with role and content)
+        history_policy: Optional token budget used to trim older turns before they reach the agent
+        coalesce_delay: Flush buffered text at most this many seconds after it arrives (0 = no time-based batching)
+        coalesce_chars: Flush buffered text once this many characters are waiting (0 = no size-based batching)
+        prefetched: Retrieval for the latest question, started by the caller (pre-retrieval mode)
+        spans: Stage timings already collected for this request by the caller
+        url_index: Project name -> URL matcher used to check the final answer
 
     Yields:
         Dict with 'event' and 'data' keys for streaming updates
@@ -262,28 +493,62 @@ async def generate_agent_stream(
     last_user_msg = next((msg.content for msg in reversed(messages) if msg.role == "user"), "")
     logger.info(f"Starting stream for input: '{last_user_msg[:50]}...' (with {len(messages)} messages in history)")
 
-    # Track the last seen text to calculate deltas
-    last_text = ""
-    tool_context = ""  # Track context from tool calls
-    project_urls = {}  # Track project URLs from context
+    # How much of the current model message has been streamed
+    emitted = 0
+
+    # Checks each streamed delta for projects mentioned without their URL
+    url_verifier = StreamingUrlVerifier(url_index or ProjectUrlIndex())
 
     # Convert MessageDict objects to dicts for the agent
     messages_list = [{"role": msg.role, "content": msg.content} for msg in messages]
 
-    try:
+    # Keep long sessions within the history token budget
+    if history_policy is not None:
+        trimmed = history_policy.apply(messages_list)
+        if trimmed.dropped:
+            logger.info(
+                f"History trimmed: {trimmed.tokens_before} -> {trimmed.tokens_after} tokens "
+                f"(saved ~{trimmed.tokens_saved}, dropped {trimmed.dropped} messages, "
+                f"summarized={trimmed.summarized})"
+            )
+        messages_list = trimmed.messages
+
+    # Per-stage timings for this request (retrieval spans are added from the tool)
+    spans = start_request_spans(spans)
+    stream_start = time.perf_counter()
+    first_token_seen = False
+    status = "ok"
+    retrieval_mode = "tool"
+
+    # Pre-retrieval mode: hand the context to the first model call
+    if prefetched is not None:
+        try:
+            result = await prefetched
+        except Exception as e:
+            logger.warning(f"Pre-retrieval failed, falling back to the search tool: {e}")
+        else:
+            retrieval_mode = "prefetch"
+            url_verifier.track(result.project_urls)
+            messages_list.insert(
+                len(messages_list) - 1,
+                {"role": "system", "content": PREFETCH_CONTEXT_PROMPT + result.context},
+            )
+
+    async def text_deltas() -> AsyncIterator[str]:
+        """New answer text from each agent step, tracked by offset"""
+        nonlocal emitted
+
         async for chunk in agent.astream(
             {"messages": messages_list},
         ):
             # Skip chunks without model data
             if not chunk.get("model"):
-                # Check for tool results in other parts of the chunk
-                if "tool" in chunk:
-                    tool_data = chunk.get("tool", {})
-                    if "result" in tool_data:
-                        tool_context = tool_data["result"]
-                        # Extract URLs from tool context
-                        project_urls = extract_project_urls_from_context(tool_context)
-                        logger.info(f"Extracted project URLs: {project_urls}")
+                # Project URLs arrive as structured data on the search tool's results
+                for tool_message in (chunk.get("tools") or {}).get("messages", []):
+                    artifact = getattr(tool_message, "artifact", None)
+                    if isinstance(artifact, dict) and artifact:
+                        url_verifier.track(artifact)
+                        logger.info(f"Project URLs from tool results: {artifact}")
                 continue
 
             messages = chunk["model"].get("messages", [])
@@ -291,25 +556,34 @@ async def generate_agent_stream(
                 continue
 
             last_message = messages[-1]
-            content_blocks = getattr(last_message, "content_blocks", [])
 
-            # Skip if no content blocks
-            if not content_blocks:
-                continue
-
-            last_content_block = content_blocks[-1]
-            content_type = last_content_block.get("type")
-
-            if content_type == "text":
+            # Plain-text messages are the common case; read the string directly
+            # rather than building content blocks for the whole answer each step
+            content = getattr(last_message, "content", None)
+            if isinstance(content, str) and not getattr(last_message, "tool_calls", None):
+                content_type = "text"
+                text_content = content
+            else:
+                content_blocks = getattr(last_message, "content_blocks", [])
+
+                # Skip if no content blocks
+                if not content_blocks:
+                    continue
+
+                last_content_block = content_blocks[-1]
+                content_type = last_content_block.get("type")
                 text_content = last_content_block.get("text", "")
 
-                # Calculate the delta (new text since last chunk)
-                if text_content and text_content != last_text:
-                    delta = text_content[len(last_text) :]
-                    last_text = text_content
+            if content_type == "text":
+                # A message shorter than what we've streamed is a new message
+                if len(text_content) < emitted:
+                    emitted = 0
 
-                    if delta:
-                        yield {"event": "update", "data": delta}
+                # The delta is everything past the streamed offset
+                if len(text_content) > emitted:
+                    delta = text_content[emitted:]
+                    emitted = len(text_content)
+                    yield delta
 
             elif content_type == "tool_call":
                 # Track tool calls to capture context
@@ -318,19 +592,32 @@ async def generate_agent_stream(
                 # Optionally notify user
                 # yield {"event": "tool", "data": f"\n[Searching portfolio...]\n"}
 
-        # After streaming is complete, verify URLs were included
-        if project_urls and last_text:
-            verified_text = ensure_urls_in_response(last_text, project_urls)
-            if verified_text != last_text:
-                # URLs were missing, append them
-                additional_text = verified_text[len(last_text) :]
-                logger.info(f"Adding missing URLs: {additional_text[:100]}")
-                yield {"event": "update", "data": additional_text}
+    try:
+        async for delta in coalesce_deltas(text_deltas(), coalesce_delay, coalesce_chars):
+            if not first_token_seen:
+                first_token_seen = True
+                first_token = time.perf_counter() - stream_start
+                record_stage("first_token", first_token)
+                FIRST_TOKEN_SECONDS.observe(first_token, retrieval_mode=retrieval_mode)
+            url_verifier.feed(delta)
+            yield {"event": "update", "data": delta}
+
+        # Projects mentioned without their URL were tracked as the answer streamed
+        missing_urls = url_verifier.missing()
+        if missing_urls:
+            logger.info(f"Adding missing URLs: {missing_urls}")
+            yield {"event": "update", "data": project_links_block(missing_urls)}
 
     except Exception as e:
+        status = "error"
         logger.error(f"Error during streaming: {e}", exc_info=True)
         yield {"event": "error", "data": f"Stream error: {str(e)}"}
 
+    finally:
+        record_stage("stream_total", time.perf_counter() - stream_start)
+        STREAMS_TOTAL.inc(status=status)
+        logger.info(f"Stream timings ({retrieval_mode} retrieval): {json.dumps(spans)}")
+
 
 @app.post("/chat/stream")
 async def chat_stream(request: ChatRequest, app_request: Request):
@@ -343,23 +630,149 @@ async def chat_stream(request: ChatRequest, app_request: Request):
     print("Not input validation")
 
     if not hasattr(app_request.app.state, "agent"):
-        return {"error": "Agent not initialized. Server may still be starting up."}
+        return JSONResponse(
+            {"error": "Agent not initialized. Server may still be starting up."},
+            status_code=503,
+            headers={"Retry-After": "2"},
+        )
 
-    return EventSourceResponse(
-        generate_agent_stream(app_request.app.state.agent, request.messages),
+    # Open streams are draining; send new conversations to another worker
+    if is_shutting_down():
+        return JSONResponse(
+            {"error": "Server is shutting down, please retry."},
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+
+    # Rate limit per client
+    admission = getattr(app_request.app.state, "admission", None)
+    client = app_request.client.host if app_request.client else "unknown"
+    if admission is not None:
+        try:
+            admission.check_rate(client)
+        except AdmissionRejected as e:
+            logger.info(f"Rejected stream from {client}: {e.reason}")
+            return admission_rejected_response(e)
+
+    # A single-turn question identical to one already being answered shares
+    # that run: buffered events are replayed, then new ones arrive as they're
+    # produced. Followers make no upstream calls, so they don't take a slot.
+    single_turn = len(request.messages) == 1 and request.messages[0].role == "user"
+    single_flight = getattr(app_request.app.state, "single_flight", None)
+    flight_key = None
+    if single_flight is not None and single_turn:
+        flight_key = f"{app_request.app.state.retriever.index_version}:{normalize_query(request.messages[0].content)}"
+        shared = single_flight.join(flight_key)
+        if shared is not None:
+            return sse_response(shared)
+
+    # Single-turn questions can be answered from the response cache. The lookup
+    # comes before any slot or retrieval: replays make no upstream calls
+    response_cache = getattr(app_request.app.state, "response_cache", None)
+    if response_cache is not None and single_turn:
+        question = request.messages[0].content
+        version = app_request.app.state.retriever.index_version
+        try:
+            answer = await response_cache.lookup(question, version)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed, answering live: {e}")
+            answer = None
+        if answer is not None:
+            logger.info(f"Response cache hit for '{question[:50]}'")
+            return sse_response(response_cache.replay(answer))
+        # The same question may have started a shared run during the lookup
+        if flight_key is not None:
+            shared = single_flight.join(flight_key)
+            if shared is not None:
+                return sse_response(shared)
+
+    # Take a stream slot or a place in the queue
+    ticket = None
+    if admission is not None:
+        try:
+            ticket = admission.admit(client)
+        except AdmissionRejected as e:
+            logger.info(f"Rejected stream from {client}: {e.reason}")
+            return admission_rejected_response(e)
+
+    # Start retrieval for the latest question straight away so it overlaps
+    # with the rest of request handling. Queued requests skip it: it would
+    # make upstream calls before the request holds a slot.
+    spans = start_request_spans()
+    prefetched = None
+    admitted = ticket is None or ticket.admitted
+    if (
+        RETRIEVAL_MODE == "prefetch"
+        and admitted
+        and request.messages
+        and request.messages[-1].role == "user"
+    ):
+        prefetched = asyncio.ensure_future(
+            app_request.app.state.retriever.retrieve(request.messages[-1].content)
+        )
+
+    events = generate_agent_stream(
+        app_request.app.state.agent,
+        request.messages,
+        history_policy=getattr(app_request.app.state, "history_policy", None),
+        coalesce_delay=STREAM_COALESCE_MS / 1000,
+        coalesce_chars=STREAM_COALESCE_CHARS,
+        prefetched=prefetched,
+        spans=spans,
+        url_index=getattr(app_request.app.state, "url_index", None),
+    )
+
+    # Misses record the answer for later questions
+    if response_cache is not None and single_turn:
+        events = response_cache.record(question, events, version)
+
+    if flight_key is not None:
+        # The slot is held for the shared run, however many clients follow it,
+        # and released when the run ends (even if it never started streaming)
+        on_done = None
+        if ticket is not None:
+            events = admission.guard(ticket, events)
+            on_done = partial(admission.release, ticket)
+        return sse_response(single_flight.lead(flight_key, events, on_done=on_done))
+
+    if ticket is None:
+        return sse_response(events)
+    # The guard releases the slot when the stream ends; the background task
+    # covers a response that never started streaming
+    return sse_response(
+        admission.guard(ticket, events), background=BackgroundTask(admission.release, ticket)
     )
 
 
 @app.get("/health")
 async def health_check(request: Request):
-    """Health check endpoint"""
+    """Liveness check: the process is up and serving (see /ready for readiness)"""
     return {
-        "status": "healthy",
+        "status": "draining" if is_shutting_down() else "healthy",
         "vector_store_ready": hasattr(request.app.state, "vectorstore"),
         "agent_ready": hasattr(request.app.state, "agent"),
     }
 
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness check: 200 once the agent is initialized, 503 while starting, failed or draining"""
+    startup = getattr(request.app.state, "startup", {"status": "starting"})
+    ready = hasattr(request.app.state, "agent") and not is_shutting_down()
+    return JSONResponse(
+        {**startup, "ready": ready, "draining": is_shutting_down()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/tools")
 async def list_tools(request: Request):
     """List available tools"""
@@ -370,8 +783,13 @@ async def list_tools(request: Request):
         "tools": [
             {
                 "name": "search_portfolio",
-                "description": "Search through Jasper's portfolio documents including CV, projects, and experience.",
-            }
+                "description": "Search through Jasper's portfolio documents including CV, projects, and experience, "
+                "optionally filtered by document type and tags.",
+            },
+            {
+                "name": "list_projects",
+                "description": "List all of Jasper's projects with their links and details, optionally by tag.",
+            },
         ]
     }
 
@@ -382,23 +800,18 @@ async def debug_search(request: Request, query: str = "projects"):
     Debug endpoint to test the search tool and URL extraction.
     Example: /debug/search?query=projects
     """
-    if not hasattr(request.app.state, "vectorstore"):
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    if not hasattr(request.app.state, "retriever"):
         return {"error": "Vector store not initialized"}
 
-    # Test the search
-    results = request.app.state.vectorstore.similarity_search(query, k=5)
+    # Test the search (same cached async path as the search_portfolio tool)
+    result = await request.app.state.retriever.retrieve(query)
+    results = result.docs
 
-    # Extract URLs
-    project_urls = {}
-    for doc in results:
-        metadata = doc.metadata
-        project_name = metadata.get("name") or metadata.get("file_name", "").replace(
-            ".md", ""
-        )
-        live_url = metadata.get("live_url")
-
-        if live_url and live_url.lower() != "null" and live_url.strip():
-            project_urls[project_name] = live_url
+    # URLs extracted from the results' metadata
+    project_urls = result.project_urls
 
     return {
         "query": query,
@@ -414,3 +827,78 @@ async def debug_search(request: Request, query: str = "projects"):
             for doc in results[:3]
         ],
     }
+
+
+
+@app.get("/debug/cache")
+async def debug_cache(request: Request):
+    """Cache statistics (size, hits, misses) for the embedding, result and response caches"""
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    if not hasattr(request.app.state, "embeddings"):
+        return {"error": "Embeddings not initialized"}
+
+    stats = {"embedding_cache": request.app.state.embeddings.cache.stats()}
+    if hasattr(request.app.state, "retriever"):
+        stats["result_cache"] = request.app.state.retriever.result_cache.stats()
+        stats["index_version"] = request.app.state.retriever.index_version
+    if hasattr(request.app.state, "response_cache"):
+        stats["response_cache"] = request.app.state.response_cache.stats()
+    return stats
+
+
+@app.get("/debug/admission")
+async def debug_admission(request: Request):
+    """Active and queued streams and the configured admission limits"""
+    denied = admin_denied(request)
+    if denied is not None:
+        return denied
+    if not hasattr(request.app.state, "admission"):
+        return {"error": "Admission control not initialized"}
+    return request.app.state.admission.stats()
+
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: Request, version: str | None = None):
+    """
+    Pick up a rebuilt index: call after scripts/build_pinecone.py has written
+    the new INDEX_DIR. On a new build version the INDEX_DIR artifacts (local
+    vectors, chunk store, BM25 index, project catalogs) are reloaded and the
+    retrieval result and response caches dropped. Without a version it is
+    read from INDEX_DIR/build_info.json. Needs `Authorization: Bearer <ADMIN_TOKEN>`.
+    """
+    denied = admin_denied(request, required=True)
+    if denied is not None:
+        return denied
+    if not hasattr(request.app.state, "retriever"):
+        return {"error": "Vector store not initialized"}
+
+    retriever = request.app.state.retriever
+    if version is None:
+        version = read_index_version(request.app.state.index_dir)
+    if version is None or version != retriever.index_version:
+        try:
+            artifacts = await asyncio.to_thread(
+                load_index_artifacts,
+                request.app.state.index_dir,
+                request.app.state.embeddings,
+                request.app.state.vector_backend,
+            )
+        except Exception as e:
+            logger.error(f"Could not reload the index, still serving the old one: {e}", exc_info=True)
+            return JSONResponse({"error": f"Could not reload the index: {e}"}, status_code=500)
+
+        if artifacts.local_vectors is not None:
+            request.app.state.vectorstore = artifacts.local_vectors
+        retriever.replace_index(request.app.state.vectorstore, artifacts.lexical_index, artifacts.chunk_store)
+        request.app.state.url_index = artifacts.url_index
+        request.app.state.project_catalog = artifacts.project_catalog
+
+    invalidated = retriever.invalidate(version)
+    if invalidated and hasattr(request.app.state, "response_cache"):
+        request.app.state.response_cache.cache.clear()
+    return {
+        "invalidated": invalidated,
+        "index_version": retriever.index_version,
+    }
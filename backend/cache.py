@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import CACHE_LOOKUPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalise a query into a cache key.
+    Case, surrounding whitespace/punctuation and repeated spaces are ignored,
+    so "What projects have you built?" and "what projects have you built" share a key.
+    """
+    return _WHITESPACE.sub(" ", text.casefold()).strip(" \t\n?!.,;:")
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries expire `ttl` seconds after they were stored and the least recently
+    used entry is evicted once `max_size` is reached. Expiry uses wall-clock
+    time so entries keep their meaning when dumped to disk and reloaded.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0, name: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._data[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+
+        if self.name:
+            CACHE_LOOKUPS_TOTAL.inc(cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (expires_at or time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def entries(self) -> List[tuple]:
+        """Snapshot of live (key, expires_at, value) entries, oldest first"""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, expires_at, value)
+                for key, (expires_at, value) in self._data.items()
+                if expires_at > now
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 2: embeddings of the query as written (format 1 embedded the normalised cache key)
+PERSIST_FORMAT = 2
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that caches query embeddings by normalised query text.
+
+    The normalised text is only the cache key: the model embeds the query as
+    written, since case and punctuation matter in names like "Next.js" or "S3".
+
+    Only `embed_query` is cached - document embeddings are produced once at
+    index build time. If `persist_path` is set the cache is loaded from and
+    saved to that JSON file so it survives server restarts.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_size: int = 1024,
+        ttl: float = 86400.0,
+        persist_path: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = TTLCache(max_size=max_size, ttl=ttl, name="embedding")
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._model = getattr(embeddings, "model", type(embeddings).__name__)
+
+        if self.persist_path and self.persist_path.exists():
+            self.load()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        embedding = self.cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(text)
+            self.cache.set(key, embedding)
+        return embedding
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        embedding = self.cache.get(key)
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(text)
+            self.cache.set(key, embedding)
+        return embedding
+
+    def load(self) -> None:
+        """Load persisted entries, skipping expired ones and those from another model"""
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load embedding cache from {self.persist_path}: {e}")
+            return
+
+        if data.get("model") != self._model or data.get("format") != PERSIST_FORMAT:
+            logger.info("Embedding cache was built with a different model or format, ignoring it")
+            return
+
+        now = time.time()
+        for key, expires_at, embedding in data.get("entries", []):
+            if expires_at > now:
+                self.cache.set(key, embedding, expires_at=expires_at)
+        logger.info(f"Loaded {len(self.cache)} cached query embeddings")
+
+    def save(self) -> None:
+        """Write live entries to the persistence file (atomically)"""
+        if not self.persist_path:
+            return
+
+        data = {"model": self._model, "format": PERSIST_FORMAT, "entries": self.cache.entries()}
+        tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.persist_path)
+            logger.info(f"Saved {len(data['entries'])} query embeddings to {self.persist_path}")
+        except OSError as e:
+            logger.warning(f"Could not save embedding cache to {self.persist_path}: {e}")
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_FILE = "chunks.sqlite"
+
+# The only metadata kept on the vectors themselves: what retrieval filters on
+FILTER_FIELDS = ("type", "tags")
+
+# Index builds from this metadata format on keep chunk text only in the chunk store
+# (recorded as `metadata_format` in INDEX_DIR/build_info.json)
+SLIM_METADATA_FORMAT = 3
+
+
+def slim_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Vector metadata for a chunk: its filter fields, everything else lives in the chunk store"""
+    return {key: metadata[key] for key in FILTER_FIELDS if key in metadata}
+
+
+class ChunkStore:
+    """
+    Chunk text and metadata by chunk ID, in INDEX_DIR/chunks.sqlite.
+
+    Vectors only carry their ID and filter fields, so similarity queries
+    return a few bytes per match instead of the chunk text twice over; the
+    retriever fills the documents in from here after the query returns.
+    Written by scripts/build_pinecone.py.
+    """
+
+    def __init__(self, path: str, preview_chars: int = 1000):
+        self.path = path
+        self.preview_chars = preview_chars
+        # Read-only; retrieval threads share the connection under a lock
+        self._connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, index_dir: str, required: bool = False, **kwargs: Any) -> Optional["ChunkStore"]:
+        """
+        Open INDEX_DIR/chunks.sqlite, or None if there isn't one.
+        With `required` (the index's vectors carry no text) a missing store
+        raises FileNotFoundError rather than serving empty documents.
+        """
+        path = Path(index_dir) / CHUNKS_FILE
+        if not path.exists():
+            if required:
+                raise FileNotFoundError(
+                    f"{path} is missing but the index was built with a chunk store; "
+                    f"deploy INDEX_DIR from the same build as the vectors"
+                )
+            logger.warning(
+                f"No {CHUNKS_FILE} in {index_dir}: documents only have the text stored on their "
+                f"vectors, which is none for indexes built with a chunk store"
+            )
+            return None
+        store = cls(str(path), **kwargs)
+        logger.info(f"Loaded chunk store: {len(store)} chunks")
+        return store
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """{id: (text, metadata)} for the IDs that are stored"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {chunk_id: (text, json.loads(metadata)) for chunk_id, text, metadata in rows}
+
+    def hydrate(self, docs: List[Document]) -> List[Document]:
+        """
+        Fill in the text and metadata of documents returned by a vector query.
+        The documents take the shape they had when vectors carried everything:
+        the first `preview_chars` characters as page_content and the whole
+        chunk as `full_text`. Documents not in the store are left as they are.
+        """
+        chunks = self.get_many(doc.id for doc in docs if doc.id)
+        hydrated = []
+        for doc in docs:
+            chunk = chunks.get(doc.id)
+            if chunk is None:
+                hydrated.append(doc)
+                continue
+            text, metadata = chunk
+            hydrated.append(
+                Document(
+                    id=doc.id,
+                    page_content=text[:self.preview_chars],
+                    metadata={"full_text": text, **metadata},
+                )
+            )
+        return hydrated
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class ChunkStoreWriter:
+    """
+    Writer for INDEX_DIR/chunks.sqlite.
+
+    Works on a copy of the existing store (when `merge_existing` is set) or a
+    new one; `close()` deletes stale chunks and swaps the file into place, so
+    servers with the old store open keep a consistent view.
+    """
+
+    def __init__(self, index_dir: str, merge_existing: bool = False):
+        self.index_path = Path(index_dir)
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.ids = set()
+        self._tmp_path = self.index_path / (CHUNKS_FILE + ".tmp")
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+        existing = self.index_path / CHUNKS_FILE
+        if merge_existing and existing.exists():
+            shutil.copyfile(existing, self._tmp_path)
+        self._connection = sqlite3.connect(self._tmp_path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+
+    def add(self, chunk_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        if chunk_id in self.ids:
+            return
+        self.ids.add(chunk_id)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)",
+            (chunk_id, text, json.dumps(metadata)),
+        )
+
+    def close(self, delete_ids: Iterable[str] = ()) -> None:
+        self._connection.executemany(
+            "DELETE FROM chunks WHERE id = ?", ((chunk_id,) for chunk_id in delete_ids)
+        )
+        self._connection.commit()
+        self._connection.execute("VACUUM")
+        self._connection.close()
+        os.replace(self._tmp_path, self.index_path / CHUNKS_FILE)
@@ -0,0 +1,63 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+
+def build_filter(doc_type: Optional[str] = None, tags: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Pinecone metadata filter for a document type and/or tags (any of them), or None.
+    Tags are matched lower-cased, as build_pinecone.py stores them.
+    """
+    conditions = []
+    if doc_type:
+        conditions.append({"type": {"$eq": doc_type.strip().lower()}})
+    tags = [tag.strip().lower() for tag in tags or () if tag.strip()]
+    if tags:
+        conditions.append({"tags": {"$in": tags}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def _values(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def matches_filter(metadata: Mapping[str, Any], metadata_filter: Optional[Mapping[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter against one record.
+
+    Supports $and/$or and the $eq, $ne, $in and $nin operators (a bare value
+    means $eq). As in Pinecone, a list-valued field such as `tags` matches
+    if any of its elements does.
+    """
+    if not metadata_filter:
+        return True
+
+    for key, condition in metadata_filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        if not isinstance(condition, Mapping):
+            condition = {"$eq": condition}
+        present = key in metadata
+        values = _values(metadata.get(key))
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                ok = present and operand in values
+            elif operator == "$ne":
+                ok = not present or operand not in values
+            elif operator == "$in":
+                ok = present and any(value in operand for value in values)
+            elif operator == "$nin":
+                ok = not present or not any(value in operand for value in values)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not ok:
+                return False
+    return True
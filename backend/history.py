@@ -0,0 +1,147 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Rough per-message cost of role markers and separators in the prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Average characters per token for English text with Gemini/GPT-style tokenizers
+CHARS_PER_TOKEN = 4.0
+
+# Shortest cut-down question worth including in a history summary
+MIN_SUMMARY_QUESTION_CHARS = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate for a piece of text.
+
+    Uses a characters-per-token ratio rather than a real tokenizer - it only
+    has to be good enough to keep prompts under a budget, and it costs
+    nothing on the request path.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class TrimmedHistory:
+    messages: List[Dict[str, str]]
+    tokens_before: int
+    tokens_after: int
+    dropped: int
+    summarized: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HistoryPolicy:
+    """
+    Token budget for the conversation history sent to the agent.
+
+    The most recent `min_recent_messages` user and assistant messages are
+    always kept, reaching back to the user message that opens them if the
+    window would otherwise start on an assistant reply. Older messages are then added back, newest first, while
+    they fit in `max_tokens`. System messages from the client get no
+    special treatment - they count against the budget like any other
+    message and are never part of the guaranteed recent window, so they
+    can't be used to get around it (the server's own prompt isn't part of
+    the history). Whatever doesn't fit is replaced with a short extractive
+    summary of the user's earlier questions (up to `summary_max_tokens`) so
+    the agent still knows what was discussed, or simply dropped if
+    `summary_max_tokens` is 0.
+
+    A `max_tokens` of 0 disables trimming.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        min_recent_messages: int = 4,
+        summary_max_tokens: int = 150,
+    ):
+        self.max_tokens = max_tokens
+        self.min_recent_messages = max(1, min_recent_messages)
+        self.summary_max_tokens = summary_max_tokens
+
+    def apply(self, messages: List[Dict[str, str]]) -> TrimmedHistory:
+        costs = [message_tokens(message) for message in messages]
+        tokens_before = sum(costs)
+
+        if not self.max_tokens or tokens_before <= self.max_tokens:
+            return TrimmedHistory(messages, tokens_before, tokens_before, 0, False)
+
+        turns = [i for i, message in enumerate(messages) if message.get("role") != "system"]
+        start = max(0, len(turns) - self.min_recent_messages)
+        # Don't open the recent window with a reply to a question it left out
+        while start > 0 and messages[turns[start]].get("role") == "assistant":
+            start -= 1
+        keep = set(turns[start:])
+        budget = self.max_tokens - sum(costs[i] for i in keep)
+
+        # Reserve room for the summary before filling the budget with older messages
+        if self.summary_max_tokens:
+            budget -= self.summary_max_tokens + MESSAGE_OVERHEAD_TOKENS
+
+        older = [i for i in range(len(messages)) if i not in keep]
+        cutoff = len(older)
+        while cutoff > 0 and costs[older[cutoff - 1]] <= budget:
+            cutoff -= 1
+            budget -= costs[older[cutoff]]
+            keep.add(older[cutoff])
+
+        # Don't open the kept history with a dangling assistant reply
+        while cutoff < len(older) and messages[older[cutoff]].get("role") == "assistant":
+            keep.discard(older[cutoff])
+            cutoff += 1
+
+        dropped = [messages[i] for i in older[:cutoff]]
+        kept = [messages[i] for i in range(len(messages)) if i in keep]
+
+        summary = self.summarize(dropped) if dropped and self.summary_max_tokens else None
+        if summary:
+            # Ahead of the remaining messages
+            kept.insert(0, summary)
+
+        tokens_after = sum(message_tokens(message) for message in kept)
+        return TrimmedHistory(kept, tokens_before, tokens_after, len(dropped), summary is not None)
+
+    def summarize(self, dropped: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Summarise dropped turns without a model call: the user's earlier
+        questions, most recent first, truncated to the summary budget.
+        """
+        questions = [
+            " ".join(message.get("content", "").split())
+            for message in reversed(dropped)
+            if message.get("role") == "user"
+        ]
+        if not questions:
+            return None
+
+        header = "Summary of earlier conversation (older turns omitted). The user previously asked about: "
+        max_chars = int(self.summary_max_tokens * CHARS_PER_TOKEN) - len(header)
+        parts = []
+        used = 0
+        for question in questions:
+            if len(question) > 200:
+                question = question[:197] + "..."
+            room = max_chars - used - 2
+            if len(question) > room:
+                # Cut the question that doesn't fit rather than leaving it out
+                if room >= MIN_SUMMARY_QUESTION_CHARS:
+                    parts.append(question[:room - 3] + "...")
+                break
+            parts.append(question)
+            used += len(question) + 2
+
+        if not parts:
+            return None
+        return {"role": "system", "content": header + "; ".join(parts)}
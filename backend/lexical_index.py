@@ -0,0 +1,235 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from filters import matches_filter
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_FILE = "lexical.jsonl"
+
+# Words, numbers and joined identifiers like "s3-mobile", "findkairos.com" or "next.js"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-_/+#][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[.\-_/+#]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could did do does for from had has have how i if in "
+    "into is it its me my of on or our so that the their them then there these they this to "
+    "was we were what when where which who why will with would you your".split()
+)
+
+# Words that don't narrow an exact-name lookup ("findkairos project", "tell me about s3-mobile")
+NAME_QUERY_FILLER = STOPWORDS | frozenset(
+    "about app application built describe details explain info information jasper jasper's "
+    "more project projects repo s site tell website work".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased terms for BM25, minus stopwords.
+    Joined identifiers are kept whole and also split into their parts, so
+    "s3-mobile" matches both "s3-mobile" and "S3 mobile".
+    """
+    terms = []
+    for token in _TOKEN.findall(text.casefold()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if _SEPARATORS.search(token):
+            terms.extend(part for part in _SEPARATORS.split(token) if part and part not in STOPWORDS)
+    return terms
+
+
+def name_key(text: str) -> str:
+    """Spelling-insensitive key for a name: "S3 Mobile", "s3-mobile" and "s3_mobile" all give "s3mobile" """
+    return _NON_ALNUM.sub("", text.casefold())
+
+
+def _record_names(metadata: Dict[str, Any]) -> Set[str]:
+    """Name keys a chunk answers to: project name, file name and live URL host"""
+    names = set()
+    if isinstance(metadata.get("name"), str):
+        names.add(name_key(metadata["name"]))
+    if isinstance(metadata.get("file_name"), str):
+        names.add(name_key(Path(metadata["file_name"]).stem))
+    live_url = metadata.get("live_url")
+    if isinstance(live_url, str) and live_url.lower() not in ("", "null"):
+        host = re.sub(r"^[a-z]+://", "", live_url.casefold()).split("/")[0]
+        host = host[4:] if host.startswith("www.") else host
+        names.add(name_key(host))
+        names.add(name_key(host.rsplit(".", 1)[0]))
+    return {name for name in names if name}
+
+
+# Metadata kept per record: what retrieval filters on and where exact names come from
+RECORD_FIELDS = ("type", "tags", "name", "file_name", "live_url")
+
+
+def lexical_record(text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """A chunk's term counts and the metadata BM25 needs; the text itself lives in the chunk store"""
+    return {
+        "terms": dict(Counter(tokenize(text))),
+        "metadata": {key: metadata[key] for key in RECORD_FIELDS if key in metadata},
+    }
+
+
+def _upgrade_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds before the chunk store kept the chunk text in each record; keep just its terms"""
+    metadata = record["metadata"]
+    text = metadata.get("full_text") or metadata.get("text", "")
+    return {"id": record["id"], **lexical_record(text, metadata)}
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over the portfolio chunks.
+
+    Dense similarity is weak on exact identifiers - project names like
+    "s3-mobile" or "findkairos", or specific technologies - which BM25
+    ranks well. Only term counts and the filter and name fields are held
+    in memory: results are Documents with an ID and that metadata, fused
+    with vector results by ID and filled in from the chunk store. The
+    postings are built at load time from INDEX_DIR/lexical.jsonl, written
+    by scripts/build_pinecone.py.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        terms: List[Mapping[str, int]],
+        records: List[Dict[str, Any]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.records = records
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+        self._names: Dict[str, Set[int]] = defaultdict(set)
+        for i, (record_terms, record) in enumerate(zip(terms, records)):
+            for term, count in record_terms.items():
+                self._postings[term].append((i, count))
+            self._lengths.append(sum(record_terms.values()))
+            for name in _record_names(record):
+                self._names[name].add(i)
+
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        total = len(records)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @classmethod
+    def load(cls, index_dir: str, **kwargs: Any) -> "LexicalIndex":
+        """Load INDEX_DIR/lexical.jsonl; an index that was never built loads empty"""
+        ids, terms, records = [], [], []
+        try:
+            with open(Path(index_dir) / LEXICAL_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if "terms" not in record:
+                        record = _upgrade_record(record)
+                    ids.append(record["id"])
+                    terms.append(record["terms"])
+                    records.append(record["metadata"])
+        except FileNotFoundError:
+            logger.info(f"No lexical index in {index_dir}, retrieval is vector-only")
+
+        index = cls(ids, terms, records, **kwargs)
+        if records:
+            logger.info(f"Loaded lexical index: {len(index)} chunks, {len(index._postings)} terms")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _document(self, i: int) -> Document:
+        return Document(id=self.ids[i], page_content="", metadata=dict(self.records[i]))
+
+    def search_with_score(
+        self, query: str, k: int = 4, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        BM25 top-k, optionally among chunks matching a Pinecone-style filter.
+        Chunks sharing no terms with the query are never returned.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self._postings[term]:
+                length_norm = 1 - self.b + self.b * self._lengths[i] / self._average_length
+                scores[i] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+
+        if metadata_filter:
+            scores = {i: score for i, score in scores.items() if matches_filter(self.records[i], metadata_filter)}
+        top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self._document(i), score) for i, score in top]
+
+    def search(
+        self, query: str, k: int = 4, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return [doc for doc, _ in self.search_with_score(query, k=k, metadata_filter=metadata_filter)]
+
+    def exact_name(self, query: str) -> Optional[str]:
+        """
+        The name key if the query is just a known name ("s3-mobile", "findkairos project"),
+        else None. Such queries are answered from this index alone.
+        """
+        words = [word for word in _TOKEN.findall(query.casefold()) if word not in NAME_QUERY_FILLER]
+        key = name_key("".join(words))
+        return key if key in self._names else None
+
+
+class LexicalIndexWriter:
+    """
+    Streaming writer for INDEX_DIR/lexical.jsonl.
+
+    Records are appended to a temporary file as they are added. `close()`
+    copies over the existing index's records that weren't replaced or
+    deleted (when `merge_existing` is set) and swaps the file into place.
+    """
+
+    def __init__(self, index_dir: str, merge_existing: bool = False):
+        self.index_path = Path(index_dir)
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.merge_existing = merge_existing
+        self.ids: Set[str] = set()
+        self._tmp_path = self.index_path / (LEXICAL_FILE + ".tmp")
+        self._records = open(self._tmp_path, "w", encoding="utf-8")
+
+    def add(self, record_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        if record_id in self.ids:
+            return
+        self.ids.add(record_id)
+        self._records.write(json.dumps({"id": record_id, **lexical_record(text, metadata)}) + "\n")
+
+    def close(self, delete_ids: Iterable[str] = ()) -> None:
+        replaced = set(delete_ids) | self.ids
+        existing_path = self.index_path / LEXICAL_FILE
+        if self.merge_existing and existing_path.exists():
+            with open(existing_path, "r", encoding="utf-8") as existing:
+                for line in existing:
+                    record = json.loads(line)
+                    if record["id"] in replaced:
+                        continue
+                    if "terms" not in record:
+                        record = _upgrade_record(record)
+                        line = json.dumps(record) + "\n"
+                    self._records.write(line)
+        self._records.close()
+        os.replace(self._tmp_path, existing_path)
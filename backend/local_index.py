@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from filters import matches_filter
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.jsonl"
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index, a drop-in alternative to PineconeVectorStore.
+
+    Holds a (num_chunks x dimension) float32 matrix of L2-normalised
+    embeddings, so cosine similarity is a single matrix-vector product and
+    top-k is an argpartition. The matrix is memory-mapped from INDEX_DIR
+    (written by scripts/build_pinecone.py), so loading is near-instant and
+    the pages are shared between worker processes.
+
+    Records mirror the Pinecone vector metadata: `text` becomes the
+    document's page_content and everything else is its metadata.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        records: List[Dict[str, Any]],
+        embedding: Optional[Embeddings] = None,
+        text_key: str = "text",
+    ):
+        if len(ids) != vectors.shape[0] or len(records) != vectors.shape[0]:
+            raise ValueError(
+                f"Index is inconsistent: {len(ids)} ids, {len(records)} records, "
+                f"{vectors.shape[0]} vectors"
+            )
+        self.ids = ids
+        self.vectors = vectors
+        self.records = records
+        self.embedding = embedding
+        self.text_key = text_key
+
+    @classmethod
+    def load(
+        cls, index_dir: str, embedding: Optional[Embeddings] = None
+    ) -> "LocalVectorIndex":
+        """Load an index written by `LocalIndexWriter`, memory-mapping the vectors"""
+        index_path = Path(index_dir)
+        vectors = np.load(index_path / VECTORS_FILE, mmap_mode="r")
+        ids, records = [], []
+        with open(index_path / RECORDS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                records.append(record["metadata"])
+
+        index = cls(ids, vectors, records, embedding=embedding)
+        logger.info(
+            f"Loaded local index: {len(index)} vectors, dimension {vectors.shape[1]}"
+        )
+        return index
+
+    @staticmethod
+    def write(index_dir: str, vectors: Iterable[Tuple[str, List[float], dict]]) -> None:
+        """
+        Write (id, embedding, metadata) tuples - the same shape that is upserted
+        to Pinecone - replacing any existing index.
+        """
+        writer = LocalIndexWriter(index_dir)
+        for vector in vectors:
+            writer.add(*vector)
+        writer.close()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Cosine top-k over the whole matrix, or over the rows matching a Pinecone-style `filter`"""
+        if len(self) == 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if filter:
+            rows = np.array(
+                [i for i, record in enumerate(self.records) if matches_filter(record, filter)],
+                dtype=np.intp,
+            )
+            if len(rows) == 0:
+                return []
+            scores = np.full(len(self), -np.inf, dtype=np.float32)
+            scores[rows] = self.vectors[rows] @ query
+        else:
+            rows = None
+            scores = self.vectors @ query
+        k = min(k, len(scores) if rows is None else len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            metadata = dict(self.records[i])
+            text = metadata.pop(self.text_key, "")
+            results.append(
+                (Document(id=self.ids[i], page_content=text, metadata=metadata), float(scores[i]))
+            )
+        return results
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        if self.embedding is None:
+            raise ValueError("LocalVectorIndex needs an embedding model to search by text")
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k=k, **kwargs
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class LocalIndexWriter:
+    """
+    Streaming writer for a LocalVectorIndex.
+
+    Vectors are appended to temporary files as they arrive, so memory stays
+    flat however many chunks are indexed. `close()` assembles the final
+    normalised .npy matrix and JSONL records, merging in the rows of the
+    existing index when `merge_existing` is set, then swaps them into place.
+    """
+
+    COPY_ROWS = 4096  # Rows copied per step when assembling the matrix
+
+    def __init__(self, index_dir: str, merge_existing: bool = False):
+        self.index_path = Path(index_dir)
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.merge_existing = merge_existing
+        self.ids: List[str] = []
+        self.dimension: Optional[int] = None
+        self._rows_path = self.index_path / (VECTORS_FILE + ".rows.tmp")
+        self._records_path = self.index_path / (RECORDS_FILE + ".new.tmp")
+        self._rows = open(self._rows_path, "wb")
+        self._records = open(self._records_path, "w", encoding="utf-8")
+
+    def add(self, vector_id: str, embedding: List[float], metadata: dict) -> None:
+        row = np.asarray(embedding, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = row.shape[0]
+        elif row.shape[0] != self.dimension:
+            raise ValueError(f"Expected dimension {self.dimension}, got {row.shape[0]}")
+
+        norm = np.linalg.norm(row)
+        if norm:
+            row = row / norm
+        self._rows.write(row.tobytes())
+        self._records.write(json.dumps({"id": vector_id, "metadata": metadata}) + "\n")
+        self.ids.append(vector_id)
+
+    def write_through(
+        self, vectors: Iterable[Tuple[str, List[float], dict]]
+    ) -> Iterator[Tuple[str, List[float], dict]]:
+        """Add vectors as they stream past, passing them on (e.g. to a Pinecone upsert)"""
+        for vector in vectors:
+            self.add(*vector)
+            yield vector
+
+    def close(self, delete_ids: Iterable[str] = ()) -> None:
+        self._rows.close()
+        self._records.close()
+
+        existing = None
+        if self.merge_existing and (self.index_path / VECTORS_FILE).exists():
+            existing = LocalVectorIndex.load(str(self.index_path))
+        replaced = set(delete_ids) | set(self.ids)
+        keep = (
+            [i for i, vector_id in enumerate(existing.ids) if vector_id not in replaced]
+            if existing is not None
+            else []
+        )
+
+        dimension = self.dimension
+        if dimension is None and existing is not None and keep:
+            dimension = existing.vectors.shape[1]
+        total = len(keep) + len(self.ids)
+
+        # Write then rename, so servers that have the old files mapped keep a valid view
+        tmp_vectors = self.index_path / (VECTORS_FILE + ".tmp")
+        tmp_records = self.index_path / (RECORDS_FILE + ".tmp")
+        if total == 0:
+            with open(tmp_vectors, "wb") as f:
+                np.save(f, np.zeros((0, 0), dtype=np.float32))
+        else:
+            matrix = np.lib.format.open_memmap(
+                tmp_vectors, mode="w+", dtype=np.float32, shape=(total, dimension)
+            )
+            for start in range(0, len(keep), self.COPY_ROWS):
+                rows = keep[start:start + self.COPY_ROWS]
+                matrix[start:start + len(rows)] = existing.vectors[rows]
+            if self.ids:
+                new_rows = np.memmap(
+                    self._rows_path, dtype=np.float32, mode="r", shape=(len(self.ids), dimension)
+                )
+                for start in range(0, len(self.ids), self.COPY_ROWS):
+                    stop = min(start + self.COPY_ROWS, len(self.ids))
+                    matrix[len(keep) + start:len(keep) + stop] = new_rows[start:stop]
+                del new_rows
+            matrix.flush()
+            del matrix
+
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            for i in keep:
+                f.write(json.dumps({"id": existing.ids[i], "metadata": existing.records[i]}) + "\n")
+            with open(self._records_path, "r", encoding="utf-8") as new_records:
+                for line in new_records:
+                    f.write(line)
+
+        os.replace(tmp_vectors, self.index_path / VECTORS_FILE)
+        os.replace(tmp_records, self.index_path / RECORDS_FILE)
+        self._rows_path.unlink()
+        self._records_path.unlink()
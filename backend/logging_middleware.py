@@ -1,10 +1,9 @@
 import time
 import json
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import Message
+import random
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Configure logging
 logging.basicConfig(
@@ -14,86 +13,135 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware:
     """
-    Middleware to log all incoming requests and outgoing responses.
-    Captures method, path, headers, body, status code, and response time.
+    Pure ASGI middleware to log all incoming requests and outgoing responses.
+    Captures method, path, headers, a capped body preview, status code and timing.
+
+    Nothing is buffered: request body chunks are passed straight through to the
+    app while at most `max_body_log_bytes` are copied for the log (on a
+    `body_sample_rate` fraction of requests), and response messages are
+    forwarded as they are sent. Timing uses `time.perf_counter` and covers
+    both time to first byte and total duration, which for an
+    EventSourceResponse is the whole stream.
     """
-    
-    async def set_body(self, request: Request):
-        """Capture and store request body"""
-        receive_ = await request._receive()
-        
-        async def receive() -> Message:
-            return receive_
-        
-        request._receive = receive
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_log_bytes: int = 2048,
+        body_sample_rate: float = 1.0,
+    ):
+        self.app = app
+        self.max_body_log_bytes = max_body_log_bytes
+        self.body_sample_rate = body_sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Start timer
-        start_time = time.time()
-        
+        start_time = time.perf_counter()
+
         # Capture request details
-        request_id = request.headers.get("x-request-id", f"{time.time()}")
-        
-        # Get request body if present
-        request_body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                if body:
-                    request_body = body.decode('utf-8')
-                    # Try to parse as JSON for better logging
-                    try:
-                        request_body = json.loads(request_body)
-                    except json.JSONDecodeError:
-                        pass
-            except Exception as e:
-                logger.warning(f"Could not read request body: {e}")
-        
-        # Log request
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id", f"{time.time()}")
+        client = scope.get("client")
         request_log = {
             "request_id": request_id,
-            "method": request.method,
-            "path": request.url.path,
-            "query_params": dict(request.query_params),
-            "client_host": request.client.host if request.client else None,
-            "user_agent": request.headers.get("user-agent"),
-            "content_type": request.headers.get("content-type"),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_params": dict(QueryParams(scope.get("query_string", b""))),
+            "client_host": client[0] if client else None,
+            "user_agent": headers.get("user-agent"),
+            "content_type": headers.get("content-type"),
         }
-        
-        if request_body:
-            request_log["body"] = request_body
-        
-        logger.info(f"REQUEST: {json.dumps(request_log)}")
-        
+
+        capture_body = (
+            scope["method"] in ("POST", "PUT", "PATCH")
+            and self.max_body_log_bytes > 0
+            and random.random() < self.body_sample_rate
+        )
+        body_preview = bytearray()
+        body_size = 0
+        request_logged = False
+
+        def log_request() -> None:
+            nonlocal request_logged
+            request_logged = True
+            if body_size:
+                request_log["body"] = body_preview.decode("utf-8", errors="replace")
+                request_log["body_bytes"] = body_size
+                if body_size > len(body_preview):
+                    request_log["body_truncated"] = True
+            logger.info(f"REQUEST: {json.dumps(request_log)}")
+
+        if not capture_body:
+            log_request()
+
+        async def receive_wrapper() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if capture_body and not request_logged and message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                room = self.max_body_log_bytes - len(body_preview)
+                if room > 0:
+                    body_preview.extend(chunk[:room])
+                if not message.get("more_body", False):
+                    log_request()
+            return message
+
+        status_code = None
+        first_byte_time = None
+        response_logged = False
+
+        def log_response(completed: bool) -> None:
+            nonlocal response_logged
+            response_logged = True
+            end_time = time.perf_counter()
+            response_log = {
+                "request_id": request_id,
+                "status_code": status_code,
+                "ttfb": f"{(first_byte_time or end_time) - start_time:.3f}s",
+                "process_time": f"{end_time - start_time:.3f}s",
+            }
+            if not completed:
+                response_log["completed"] = False
+            logger.info(f"RESPONSE: {json.dumps(response_log)}")
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, first_byte_time
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add custom header with time until the response started
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+            elif message["type"] == "http.response.body":
+                if first_byte_time is None and message.get("body"):
+                    first_byte_time = time.perf_counter()
+                if not message.get("more_body", False):
+                    await send(message)
+                    log_response(completed=True)
+                    return
+            await send(message)
+
         # Process request
         try:
-            response = await call_next(request)
+            await self.app(scope, receive_wrapper, send_wrapper)
         except Exception as e:
             # Log error
-            process_time = time.time() - start_time
             error_log = {
                 "request_id": request_id,
                 "error": str(e),
-                "process_time": f"{process_time:.3f}s"
+                "process_time": f"{time.perf_counter() - start_time:.3f}s",
             }
             logger.error(f"ERROR: {json.dumps(error_log)}")
             raise
-        
-        # Calculate process time
-        process_time = time.time() - start_time
-        
-        # Log response
-        response_log = {
-            "request_id": request_id,
-            "status_code": response.status_code,
-            "process_time": f"{process_time:.3f}s",
-        }
-        
-        logger.info(f"RESPONSE: {json.dumps(response_log)}")
-        
-        # Add custom header with process time
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
\ No newline at end of file
+        finally:
+            if not request_logged:
+                log_request()
+            if status_code is not None and not response_logged:
+                # Stream ended without a final body message (e.g. client disconnected)
+                log_response(completed=False)
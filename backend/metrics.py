@@ -0,0 +1,185 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage durations of the current request, shared by reference with child tasks
+# and executor threads so spans recorded there end up in the request's summary
+_request_spans: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            # One count per bucket, then sum and count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {_format_value(count)}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]!r}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(
+        self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "portfolio_stage_seconds",
+    "Duration of each stage of a chat request (query_embedding, vector_search, "
+    "chunk_lookup, lexical_search, fusion, context_build, first_token, stream_total)",
+)
+STREAMS_TOTAL = REGISTRY.counter(
+    "portfolio_streams_total", "Chat streams finished, by status"
+)
+FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "portfolio_first_token_seconds", "Time to first answer token, by retrieval mode (tool/prefetch)"
+)
+CACHE_LOOKUPS_TOTAL = REGISTRY.counter(
+    "portfolio_cache_lookups_total", "Cache lookups, by cache and result (hit/miss)"
+)
+RETRIEVALS_TOTAL = REGISTRY.counter(
+    "portfolio_retrievals_total", "Uncached retrievals, by path (vector, hybrid, lexical)"
+)
+
+
+def start_request_spans(spans: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Begin collecting stage durations for the current request (into `spans` if given)"""
+    if spans is None:
+        spans = {}
+    _request_spans.set(spans)
+    return spans
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Observe a stage duration and add it to the current request's spans"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans[stage] = round(spans.get(stage, 0.0) + seconds, 6)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
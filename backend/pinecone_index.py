@@ -0,0 +1,69 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class PineconeIndexSearch:
+    """
+    Similarity search that queries the Pinecone index directly.
+
+    PineconeVectorStore skips matches without a `text` field in their
+    metadata, and vectors written with a chunk store only carry their
+    filter fields. This returns every match as a Document with its ID and
+    whatever metadata the vector has, for the retriever to fill in from the
+    chunk store. Vectors from older builds that still carry `text` come back
+    with it as their page_content, as before.
+    """
+
+    def __init__(
+        self,
+        index: Any,
+        embedding: Optional[Embeddings] = None,
+        namespace: Optional[str] = None,
+        text_key: str = "text",
+    ):
+        self.index = index
+        self.embedding = embedding
+        self.namespace = namespace
+        self.text_key = text_key
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        response = self.index.query(
+            vector=embedding,
+            top_k=k,
+            filter=filter,
+            namespace=self.namespace,
+            include_metadata=True,
+        )
+        results = []
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text = metadata.pop(self.text_key, "")
+            results.append((Document(id=match.id, page_content=text, metadata=metadata), match.score))
+        return results
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        if self.embedding is None:
+            raise ValueError("PineconeIndexSearch needs an embedding model to search by text")
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k=k, **kwargs)
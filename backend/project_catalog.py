@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from url_index import project_url
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "catalog.json"
+
+# Metadata describing where a chunk came from rather than the project itself
+_INTERNAL_FIELDS = {"source", "file_type", "page", "text", "full_text"}
+
+# Fields shown on a project's first line rather than as "key: value"
+_HEADLINE_FIELDS = {"name", "type", "file_name", "live_url", "tags"}
+
+
+def catalog_entry(metadata: Mapping[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(project name, catalog metadata) for a project document, or None for other types"""
+    if metadata.get("type") != "project":
+        return None
+    name = metadata.get("name") or Path(metadata.get("file_name", "")).stem
+    if not name:
+        return None
+    return name, {key: value for key, value in metadata.items() if key not in _INTERNAL_FIELDS}
+
+
+class ProjectCatalog:
+    """
+    Every project and its frontmatter metadata, precomputed at index build time.
+
+    "What projects have you built?" needs the full list rather than the k
+    chunks most similar to the question, so the list_projects tool answers
+    it from this catalog with no embedding or vector search. Written to
+    INDEX_DIR/catalog.json by scripts/build_pinecone.py.
+    """
+
+    def __init__(self, projects: Optional[Mapping[str, Dict[str, Any]]] = None):
+        self.projects: Dict[str, Dict[str, Any]] = dict(projects or {})
+
+    @classmethod
+    def load(cls, index_dir: str) -> "ProjectCatalog":
+        path = Path(index_dir) / CATALOG_FILE
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                projects = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No {CATALOG_FILE} in {index_dir}, projects will be listed via search")
+            projects = {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load the project catalog from {path}: {e}")
+            projects = {}
+        return cls(projects)
+
+    def save(self, index_dir: str) -> None:
+        """Write the catalog to INDEX_DIR/catalog.json (atomically)"""
+        path = Path(index_dir) / CATALOG_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(self.projects.items())), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def update(self, projects: Mapping[str, Dict[str, Any]]) -> None:
+        self.projects.update(projects)
+
+    def list(self, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Projects in name order, optionally only those tagged `tag` (case-insensitive)"""
+        tag = tag.strip().lower() if tag else None
+        entries = []
+        for _, entry in sorted(self.projects.items()):
+            tags = entry.get("tags") or []
+            if isinstance(tags, str):
+                tags = [t.strip() for t in tags.split(",")]
+            if tag and tag not in (t.lower() for t in tags):
+                continue
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def project_urls(entries: List[Dict[str, Any]]) -> Dict[str, str]:
+        """{project name: live URL} for the entries that have one"""
+        return dict(filter(None, (project_url(entry) for entry in entries)))
+
+    @staticmethod
+    def render(entries: List[Dict[str, Any]]) -> str:
+        """Markdown-style list of projects for the model, URLs first like search results"""
+        lines = []
+        for entry in entries:
+            name = entry.get("name") or Path(entry.get("file_name", "")).stem
+            headline = f"- {name}"
+            url = project_url(entry)
+            if url:
+                headline += f" ({url[1]})"
+            tags = entry.get("tags")
+            if tags:
+                headline += f" [tags: {', '.join(tags) if isinstance(tags, list) else tags}]"
+            lines.append(headline)
+            for key, value in entry.items():
+                if key not in _HEADLINE_FIELDS and value not in (None, "", []):
+                    lines.append(f"  {key}: {', '.join(map(str, value)) if isinstance(value, list) else value}")
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self.projects)
@@ -0,0 +1,110 @@
+import logging
+from typing import Any, AsyncIterator, Dict, Literal, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from cache import TTLCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResponseCache:
+    """
+    Cache of whole answers to single-turn questions, matched by embedding similarity.
+
+    A question is looked up by its normalised text first and otherwise
+    compared against every cached question embedding; the best match is
+    used if its cosine similarity is at least `threshold`. Entries expire
+    after `ttl` seconds, and the whole cache is dropped as soon as it sees a
+    new index build version, so a rebuilt index never serves stale answers.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.92,
+        max_size: int = 256,
+        ttl: float = 3600.0,
+        replay_chunk_chars: int = 64,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.replay_chunk_chars = max(1, replay_chunk_chars)
+        self.cache = TTLCache(max_size=max_size, ttl=ttl, name="response")
+        self.index_version: Optional[str] = None
+
+    def _check_version(self, version: Optional[str]) -> None:
+        if version != self.index_version:
+            if len(self.cache):
+                logger.info(f"Index version {self.index_version} -> {version}, clearing response cache")
+            self.cache.clear()
+            self.index_version = version
+
+    async def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, question: str, version: Optional[str] = None) -> Optional[str]:
+        """Cached answer for `question`, or None"""
+        self._check_version(version)
+
+        key = normalize_query(question)
+        entries = self.cache.entries()
+        match = key if any(cached == key for cached, _, _ in entries) else None
+
+        if match is None and entries:
+            query = await self._embed(question)
+            matrix = np.stack([value[0] for _, _, value in entries])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                match = entries[best][0]
+                logger.info(
+                    f"Response cache matched '{question[:50]}' to '{match[:50]}' "
+                    f"(similarity {scores[best]:.3f})"
+                )
+
+        # A single get per lookup, so hit/miss stats count questions
+        entry = self.cache.get(match or key)
+        return None if entry is None else entry[1]
+
+    async def store(self, question: str, answer: str, version: Optional[str] = None) -> None:
+        self._check_version(version)
+        if not answer:
+            return
+        self.cache.set(normalize_query(question), (await self._embed(question), answer))
+
+    async def replay(self, answer: str) -> AsyncIterator[Dict[Literal["event", "data"], str]]:
+        """A cached answer as a stream of update events"""
+        size = self.replay_chunk_chars
+        for start in range(0, len(answer), size):
+            yield {"event": "update", "data": answer[start:start + size]}
+
+    async def record(
+        self,
+        question: str,
+        events: AsyncIterator[Dict[Literal["event", "data"], str]],
+        version: Optional[str] = None,
+    ) -> AsyncIterator[Dict[Literal["event", "data"], str]]:
+        """
+        Pass a live stream through, storing the answer if it completes without errors.
+        """
+        parts = []
+        failed = False
+        async for event in events:
+            if event["event"] == "update":
+                parts.append(event["data"])
+            elif event["event"] == "error":
+                failed = True
+            yield event
+
+        if not failed:
+            try:
+                await self.store(question, "".join(parts), version)
+            except Exception as e:
+                logger.warning(f"Could not cache response: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "threshold": self.threshold}
@@ -0,0 +1,258 @@
+import asyncio
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from cache import TTLCache, normalize_query
+from chunk_store import ChunkStore
+from filters import build_filter
+from lexical_index import LexicalIndex
+from metrics import RETRIEVALS_TOTAL, span
+from url_index import extract_project_urls
+
+logger = logging.getLogger(__name__)
+
+BUILD_INFO_FILE = "build_info.json"
+
+
+def read_build_info(index_dir: str) -> Dict[str, Any]:
+    """Read the build info written by scripts/build_pinecone.py, or {} if there is none"""
+    try:
+        with open(Path(index_dir) / BUILD_INFO_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def read_index_version(index_dir: str) -> Optional[str]:
+    """Read the index build version written by scripts/build_pinecone.py, if present"""
+    return read_build_info(index_dir).get("version")
+
+
+@dataclass
+class RetrievalResult:
+    """Top-k documents for a query, the context string rendered from them and their project URLs"""
+
+    docs: List[Document]
+    context: str
+    project_urls: Dict[str, str]
+
+
+class PortfolioRetriever:
+    """
+    Async front for the portfolio vector store.
+
+    The vector store client is synchronous (embedding request + index query),
+    so every lookup runs on a small dedicated thread pool. This keeps the event
+    loop free to serve other SSE streams while a retrieval is in flight, and the
+    pool size bounds how many lookups hit the upstream APIs at once.
+
+    Results are cached per normalised query for the current index build
+    version, so a repeat question skips both the embedding and index calls.
+    The corpus only changes when the index is rebuilt - call `invalidate()`
+    with the new build version to drop stale results.
+
+    With a lexical (BM25) index, vector and lexical results are combined
+    with reciprocal-rank fusion, so exact project names and technologies
+    rank well. Queries that are just a known project name are answered from
+    the lexical index alone, skipping the embedding call.
+
+    With a chunk store, vectors and lexical records carry only their ID and
+    filter fields; the text and metadata of the final results are looked up
+    locally after ranking.
+    """
+
+    def __init__(
+        self,
+        vectorstore: Any,
+        embeddings: Any = None,
+        k: int = 5,
+        max_workers: int = 4,
+        result_cache: Optional[TTLCache] = None,
+        index_dir: Optional[str] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        fusion_candidates: int = 10,
+        chunk_store: Optional[ChunkStore] = None,
+    ):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings or vectorstore.embeddings
+        self.k = k
+        self.result_cache = result_cache or TTLCache(max_size=256, ttl=3600.0, name="result")
+        self.index_dir = index_dir
+        self.index_version = read_index_version(index_dir) if index_dir else None
+        self.lexical_index = lexical_index if lexical_index is not None and len(lexical_index) else None
+        self.fusion_candidates = fusion_candidates
+        self.chunk_store = chunk_store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="retrieval"
+        )
+
+    async def search(
+        self, query: str, k: Optional[int] = None, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Run a similarity search without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        # Carry the request context into the worker thread so stage spans are attributed
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor,
+            partial(context.run, self._search, query, k or self.k, metadata_filter),
+        )
+
+    def _search(
+        self, query: str, k: int, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        docs = self._ranked_search(query, k, metadata_filter)
+        if self.chunk_store is not None:
+            with span("chunk_lookup"):
+                docs = self.chunk_store.hydrate(docs)
+        return docs
+
+    def _ranked_search(
+        self, query: str, k: int, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        if self.lexical_index is None:
+            RETRIEVALS_TOTAL.inc(path="vector")
+            return self._vector_search(query, k, metadata_filter)
+
+        candidates = max(k, self.fusion_candidates)
+        with span("lexical_search"):
+            name = self.lexical_index.exact_name(query)
+            lexical = self.lexical_index.search(query, k=candidates, metadata_filter=metadata_filter)
+        if name and lexical:
+            logger.info(f"Exact-name query '{query}', answering from the lexical index")
+            RETRIEVALS_TOTAL.inc(path="lexical")
+            return lexical[:k]
+
+        RETRIEVALS_TOTAL.inc(path="hybrid")
+        vector = self._vector_search(query, candidates, metadata_filter)
+        with span("fusion"):
+            return reciprocal_rank_fusion([vector, lexical])[:k]
+
+    def _vector_search(
+        self, query: str, k: int, metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        with span("query_embedding"):
+            embedding = self.embeddings.embed_query(query)
+        # The filter is pushed down into the index query (Pinecone or LocalVectorIndex)
+        kwargs = {"filter": metadata_filter} if metadata_filter else {}
+        with span("vector_search"):
+            return self.vectorstore.similarity_search_by_vector(embedding, k=k, **kwargs)
+
+    async def retrieve(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        doc_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> RetrievalResult:
+        """
+        Search and render the tool context, served from the result cache when possible.
+        `doc_type` and `tags` restrict the search to documents of that frontmatter
+        type and/or carrying any of the tags.
+        """
+        k = k or self.k
+        metadata_filter = build_filter(doc_type, tags)
+        key = f"{self.index_version}:{k}:{json.dumps(metadata_filter, sort_keys=True)}:{normalize_query(query)}"
+
+        result = self.result_cache.get(key)
+        if result is None:
+            docs = await self.search(query, k=k, metadata_filter=metadata_filter)
+            with span("context_build"):
+                project_urls = extract_project_urls(docs)
+                result = RetrievalResult(
+                    docs=docs,
+                    context=build_context(docs, project_urls),
+                    project_urls=project_urls,
+                )
+            self.result_cache.set(key, result)
+        return result
+
+    def replace_index(
+        self,
+        vectorstore: Any,
+        lexical_index: Optional[LexicalIndex] = None,
+        chunk_store: Optional[ChunkStore] = None,
+    ) -> None:
+        """
+        Switch to a rebuilt index's artifacts; follow with `invalidate()`.
+        The old chunk store isn't closed here, as lookups in flight may still
+        be reading it - it closes when garbage collected.
+        """
+        self.vectorstore = vectorstore
+        self.lexical_index = lexical_index if lexical_index is not None and len(lexical_index) else None
+        self.chunk_store = chunk_store
+
+    def invalidate(self, version: Optional[str] = None) -> bool:
+        """
+        Drop cached results if the index build version changed.
+
+        Args:
+            version: New build version. If omitted it is re-read from the
+                index directory; an explicit version always clears the cache
+                when it differs from the current one.
+
+        Returns:
+            True if the cache was cleared
+        """
+        if version is None and self.index_dir:
+            version = read_index_version(self.index_dir)
+
+        if version is not None and version == self.index_version:
+            return False
+
+        logger.info(f"Index version {self.index_version} -> {version}, clearing result cache")
+        self.index_version = version
+        self.result_cache.clear()
+        return True
+
+    def close(self) -> None:
+        """Stop the worker threads, dropping any queued lookups"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.chunk_store is not None:
+            self.chunk_store.close()
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], c: int = 60) -> List[Document]:
+    """
+    Merge ranked result lists: each document scores sum(1 / (c + rank)) over
+    the lists it appears in. Documents are matched by ID (falling back to
+    their text), and the first list's copy of a document is kept.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (c + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def build_context(docs: List[Document], project_urls: Optional[Dict[str, str]] = None) -> str:
+    """Render retrieved documents into the tool result, with URLs prominently featured"""
+    if project_urls is None:
+        project_urls = extract_project_urls(docs)
+    context_parts = []
+
+    # Add URL information at the top if any exist
+    if project_urls:
+        context_parts.append(
+            "IMPORTANT - Project URLs (ALWAYS include these when mentioning these projects):"
+        )
+        for project, url in project_urls.items():
+            context_parts.append(f"  • {project}: {url}")
+        context_parts.append("\nContext from documents:")
+
+    # Add document contents
+    for doc in docs:
+        context_parts.append(f"\n---\n{doc.page_content}")
+
+    return "\n".join(context_parts)
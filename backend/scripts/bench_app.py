@@ -0,0 +1,19 @@
+"""
+ASGI entry point for load tests: the real app with the offline stand-ins from bench_support.
+
+Run with lifespan disabled so no API keys are needed, e.g.
+    uvicorn bench_app:app --app-dir scripts --lifespan off --workers 4
+
+The scripted agent is configured with BENCH_ANSWER_TOKENS, BENCH_FIRST_TOKEN_MS,
+BENCH_TOKEN_MS and BENCH_TOOL_CALL_MS.
+"""
+import os
+
+from bench_support import create_bench_app
+
+app = create_bench_app(
+    answer_tokens=int(os.getenv("BENCH_ANSWER_TOKENS", "300")),
+    first_token_delay=float(os.getenv("BENCH_FIRST_TOKEN_MS", "50")) / 1000,
+    token_delay=float(os.getenv("BENCH_TOKEN_MS", "2")) / 1000,
+    tool_call_delay=float(os.getenv("BENCH_TOOL_CALL_MS", "50")) / 1000,
+)
@@ -0,0 +1,133 @@
+"""
+Offline stand-ins for the Gemini agent and Pinecone index, used by the benchmark scripts.
+
+`create_bench_app()` returns the real FastAPI app with its state populated by
+a scripted agent and an in-memory vector store instead of running `lifespan()`,
+so the full request path (middleware, SSE response, generate_agent_stream,
+retrieval) can be driven without network access or API keys.
+"""
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.vectorstores import InMemoryVectorStore
+
+# Backend modules live in the backend root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from cache import CachedEmbeddings
+from retrieval import PortfolioRetriever
+
+EMBEDDING_SIZE = 256
+
+SAMPLE_DOCUMENTS = [
+    Document(
+        page_content="findkairos.com is a web app connecting bikepackers worldwide, "
+        "built with Python FastAPI, MongoDB and Next.js.",
+        metadata={"name": "findkairos", "type": "project", "live_url": "https://findkairos.com"},
+    ),
+    Document(
+        page_content="jaspercycles.com tracks my bikepacking journey in real time "
+        "using the Strava API.",
+        metadata={"name": "jaspercycles", "type": "project", "live_url": "https://jaspercycles.com"},
+    ),
+    Document(
+        page_content="s3-mobile is a React Native app written in TypeScript.",
+        metadata={"name": "s3-mobile", "type": "project"},
+    ),
+    Document(
+        page_content="I worked for 2 years as a Software Engineer at digiLab, building "
+        "FastAPI services and extending an ML library with PyTorch and BoTorch.",
+        metadata={"file_name": "profile.md", "type": "profile"},
+    ),
+]
+
+ANSWER = (
+    "I've built several full-stack projects. findkairos is a web app connecting "
+    "bikepackers worldwide, using Python FastAPI with MongoDB and Next.js. I also "
+    "built jaspercycles, which tracks my bikepacking journey using the Strava API. "
+)
+
+
+class FakeAgent:
+    """
+    Scripted stand-in for the `create_agent` graph.
+
+    `astream` yields chunks shaped like the real agent's "updates" stream: a
+    model step with a search_portfolio tool call, the tool step, then the
+    answer growing token by token in model steps. When the request already
+    carries pre-retrieved context (RETRIEVAL_MODE=prefetch) the tool call
+    round trip is skipped, as the real model would. Latencies are simulated
+    with asyncio.sleep so concurrent streams interleave like real ones.
+    """
+
+    def __init__(
+        self,
+        retriever: Any = None,
+        answer_tokens: int = 200,
+        first_token_delay: float = 0.0,
+        token_delay: float = 0.0,
+        tool_call_delay: float = 0.0,
+    ):
+        self.retriever = retriever
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tool_call_delay = tool_call_delay
+
+        # Pre-build the answer steps so message construction isn't measured
+        words = (ANSWER.split(" ") * (answer_tokens // len(ANSWER.split(" ")) + 1))[:answer_tokens]
+        self.answer_steps = []
+        text = ""
+        for word in words:
+            text += word + " "
+            self.answer_steps.append({"model": {"messages": [AIMessage(content=text)]}})
+
+    async def astream(self, inputs: Dict[str, Any], **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        from app import PREFETCH_CONTEXT_PROMPT
+
+        query = inputs["messages"][-1]["content"]
+        prefetched = any(
+            message["role"] == "system" and message["content"].startswith(PREFETCH_CONTEXT_PROMPT)
+            for message in inputs["messages"]
+        )
+
+        if self.retriever is not None and not prefetched:
+            await asyncio.sleep(self.tool_call_delay)
+            tool_call = {"name": "search_portfolio", "args": {"query": query}, "id": "call_1"}
+            yield {"model": {"messages": [AIMessage(content="", tool_calls=[tool_call])]}}
+
+            result = await self.retriever.retrieve(query)
+            yield {"tools": {"messages": [
+                ToolMessage(content=result.context, artifact=result.project_urls, tool_call_id="call_1")
+            ]}}
+
+        await asyncio.sleep(self.first_token_delay)
+        for step in self.answer_steps:
+            yield step
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+
+
+def create_vectorstore(embeddings: Any) -> InMemoryVectorStore:
+    vectorstore = InMemoryVectorStore(embedding=embeddings)
+    vectorstore.add_documents(SAMPLE_DOCUMENTS)
+    return vectorstore
+
+
+def create_bench_app(**agent_options: Any):
+    """The real FastAPI app, with a FakeAgent and in-memory retrieval installed in its state"""
+    from app import app
+
+    embeddings = CachedEmbeddings(DeterministicFakeEmbedding(size=EMBEDDING_SIZE))
+    app.state.embeddings = embeddings
+    app.state.vectorstore = create_vectorstore(embeddings)
+    app.state.retriever = PortfolioRetriever(app.state.vectorstore, embeddings=embeddings, k=5)
+    app.state.agent = FakeAgent(retriever=app.state.retriever, **agent_options)
+    return app
+
+
+def chat_body(question: str, history: List[Dict[str, str]] = ()) -> Dict[str, Any]:
+    return {"messages": [*history, {"role": "user", "content": question}], "temperature": 0.7}
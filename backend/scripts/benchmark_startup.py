@@ -0,0 +1,183 @@
+"""
+Benchmark backend cold start.
+
+Measures, over several fresh processes:
+  - `import app` time
+  - time from launching uvicorn to the first 200 from /health (liveness) and
+    from /ready (agent built), for STARTUP_MODE=eager and STARTUP_MODE=background
+
+Servers run offline: a one-vector local index is written to a temporary
+INDEX_DIR (VECTOR_BACKEND=local) and placeholder API keys are set, since
+building the clients makes no network calls. Results are written to
+bench_results/startup-<commit>.json.
+
+Usage (from backend/):
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --compare bench_results/startup-<commit>.json
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmark_stream import git_commit
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+from local_index import LocalVectorIndex
+
+
+def summary(values):
+    return {
+        "median_s": round(statistics.median(values), 3),
+        "min_s": round(min(values), 3),
+        "max_s": round(max(values), 3),
+    }
+
+
+def measure_import(runs: int):
+    """Wall time of `import app` in fresh interpreters"""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return summary(times)
+
+
+def status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def measure_server(mode: str, port: int, env: dict, timeout: float):
+    """Seconds from process launch until /health and /ready first return 200"""
+    command = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--port", str(port), "--log-level", "warning", "--no-access-log",
+    ]
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env={**env, "STARTUP_MODE": mode},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        while time.perf_counter() - start < timeout and ready is None:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode} in {mode} mode")
+            if live is None and status(f"http://127.0.0.1:{port}/health") == 200:
+                live = time.perf_counter() - start
+            if live is not None and status(f"http://127.0.0.1:{port}/ready") == 200:
+                ready = time.perf_counter() - start
+            time.sleep(0.01)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    if ready is None:
+        raise RuntimeError(f"Server not ready within {timeout}s in {mode} mode")
+    return live, ready
+
+
+def compare(results, baseline_path: Path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def row(name, new, old):
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {name:<32} {old:>8}s -> {new:>8}s  ({change:+.1f}%)")
+
+    print(f"\nComparison with {baseline_path} ({baseline.get('commit')}):")
+    row("import app (median)", results["import"]["median_s"], baseline["import"]["median_s"])
+    for mode, level in results["modes"].items():
+        old = baseline.get("modes", {}).get(mode)
+        if old:
+            row(f"{mode} time to live", level["live"]["median_s"], old["live"]["median_s"])
+            row(f"{mode} time to ready", level["ready"]["median_s"], old["ready"]["median_s"])
+
+
+def run(args):
+    results = {
+        "benchmark": "startup",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "parameters": {"runs": args.runs},
+    }
+
+    print("Measuring import time...")
+    results["import"] = measure_import(args.runs)
+    print(f"  import app: median {results['import']['median_s']}s")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        LocalVectorIndex.write(index_dir, [("warmup", [1.0] * 8, {"text": "warmup"})])
+        env = {
+            **os.environ,
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "placeholder"),
+            "PINECONE_API_KEY": os.getenv("PINECONE_API_KEY", "placeholder"),
+            "VECTOR_BACKEND": "local",
+            "INDEX_DIR": index_dir,
+        }
+
+        results["modes"] = {}
+        for mode in ("eager", "background"):
+            lives, readies = [], []
+            for _ in range(args.runs):
+                live, ready = measure_server(mode, args.port, env, args.timeout)
+                lives.append(live)
+                readies.append(ready)
+            results["modes"][mode] = {"live": summary(lives), "ready": summary(readies)}
+            print(f"  {mode:<10} live {results['modes'][mode]['live']['median_s']}s, "
+                  f"ready {results['modes'][mode]['ready']['median_s']}s (median of {args.runs})")
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the test server")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Max seconds to wait for readiness")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Results file (default: bench_results/startup-<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results file to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.output = args.output or Path("bench_results") / f"startup-{git_commit()}.json"
+
+    results = run(args)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark the /chat/stream hot path in-process, with a scripted agent and in-memory retrieval.
+
+Measures:
+  - generate_agent_stream throughput (events and tokens per second, no model latency)
+  - time to first byte and total latency (p50/p95/p99) of /chat/stream, driven
+    through the full ASGI stack (middleware, SSE response) at several concurrency levels
+  - max concurrent streams per worker: the highest level whose p95 TTFB stays under the SLO
+  - time to first byte with RETRIEVAL_MODE=tool vs prefetch (tool-call round trip vs pre-retrieval)
+
+Results are written to a JSON file tagged with the current commit, and can be
+compared against an earlier run with --compare.
+
+Usage (from backend/):
+    python scripts/benchmark_stream.py
+    python scripts/benchmark_stream.py --compare bench_results/stream-<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench_support import FakeAgent, chat_body, create_bench_app
+
+QUESTIONS = [
+    "What projects have you built?",
+    "What Python experience do you have?",
+    "Tell me about findkairos",
+    "What languages does s3-mobile use?",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values):
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+    }
+
+
+async def stream_request(app, body: bytes):
+    """
+    Drive one POST /chat/stream through the ASGI app.
+
+    Returns:
+        (time to first body byte, total time, number of body chunks) in seconds
+    """
+    start = time.perf_counter()
+    first_byte = None
+    chunks = 0
+    finished = asyncio.Event()
+    request_messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if request_messages:
+            return request_messages.pop(0)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first_byte, chunks
+        if message["type"] == "http.response.body":
+            if message.get("body"):
+                chunks += 1
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+            if not message.get("more_body"):
+                finished.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/chat/stream",
+        "raw_path": b"/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"accept", b"text/event-stream"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    end = time.perf_counter()
+    return (first_byte or end) - start, end - start, chunks
+
+
+async def bench_generator(answer_tokens: int, runs: int, coalesce_ms: float = 0.0, coalesce_chars: int = 0):
+    """Raw generate_agent_stream throughput with zero simulated model latency"""
+    from app import MessageDict, generate_agent_stream
+
+    agent = FakeAgent(answer_tokens=answer_tokens)
+    messages = [MessageDict(role="user", content=QUESTIONS[0])]
+
+    events = 0
+    chars = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        async for event in generate_agent_stream(
+            agent, messages, coalesce_delay=coalesce_ms / 1000, coalesce_chars=coalesce_chars
+        ):
+            events += 1
+            chars += len(event["data"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "answer_tokens": answer_tokens,
+        "runs": runs,
+        "seconds": round(elapsed, 4),
+        "tokens_per_second": round(answer_tokens * runs / elapsed, 1),
+        "events_per_second": round(events / elapsed, 1),
+        "chars_per_second": round(chars / elapsed, 1),
+    }
+
+
+async def bench_concurrency(app, concurrency: int, requests: int):
+    """Run `requests` streams with at most `concurrency` open at once"""
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfbs, totals = [], []
+
+    async def one(i):
+        body = json.dumps(chat_body(QUESTIONS[i % len(QUESTIONS)])).encode()
+        async with semaphore:
+            ttfb, total, _ = await stream_request(app, body)
+        ttfbs.append(ttfb)
+        totals.append(total)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "streams_per_second": round(requests / elapsed, 2),
+        "ttfb": latency_summary(ttfbs),
+        "total": latency_summary(totals),
+    }
+
+
+async def bench_retrieval_modes(app, app_module, requests: int):
+    """Sequential TTFB with the model calling the search tool vs pre-retrieved context"""
+    original = app_module.RETRIEVAL_MODE
+    modes = {}
+    try:
+        for mode in ("tool", "prefetch"):
+            app_module.RETRIEVAL_MODE = mode
+            # Start each mode with a cold result cache so neither is favoured
+            app.state.retriever.result_cache.clear()
+            modes[mode] = await bench_concurrency(app, 1, requests)
+    finally:
+        app_module.RETRIEVAL_MODE = original
+    return modes
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path: Path):
+    """Print key metrics next to a previous results file"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def row(name, new, old, higher_is_better):
+        change = (new - old) / old * 100 if old else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {name:<40} {old:>12} -> {new:>12}  ({change:+.1f}%{' better' if better else ''})")
+
+    print(f"\nComparison with {baseline_path} ({baseline.get('commit')}):")
+    row("generator tokens/sec", results["generator"]["tokens_per_second"],
+        baseline["generator"]["tokens_per_second"], True)
+    old_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in results["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old:
+            row(f"c={level['concurrency']} p95 TTFB ms", level["ttfb"]["p95_ms"], old["ttfb"]["p95_ms"], False)
+            row(f"c={level['concurrency']} p95 total ms", level["total"]["p95_ms"], old["total"]["p95_ms"], False)
+    row("max concurrent streams", results["max_concurrent_streams"],
+        baseline["max_concurrent_streams"], True)
+    for mode, level in results.get("retrieval_modes", {}).items():
+        old = baseline.get("retrieval_modes", {}).get(mode)
+        if old:
+            row(f"{mode} retrieval p50 TTFB ms", level["ttfb"]["p50_ms"], old["ttfb"]["p50_ms"], False)
+
+
+async def run(args):
+    import app as app_module
+
+    results = {
+        "benchmark": "chat_stream",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": vars(args).copy(),
+    }
+    results["parameters"].pop("compare")
+    results["parameters"]["output"] = str(args.output)
+
+    print("Benchmarking generate_agent_stream throughput...")
+    results["generator"] = await bench_generator(
+        args.answer_tokens, args.generator_runs, args.coalesce_ms, args.coalesce_chars
+    )
+    print(f"  {results['generator']['tokens_per_second']} tokens/sec, "
+          f"{results['generator']['events_per_second']} events/sec")
+
+    # Coalescing settings are read by the /chat/stream endpoint
+    app_module.STREAM_COALESCE_MS = args.coalesce_ms
+    app_module.STREAM_COALESCE_CHARS = args.coalesce_chars
+    app = create_bench_app(
+        answer_tokens=args.answer_tokens,
+        first_token_delay=args.first_token_ms / 1000,
+        token_delay=args.token_ms / 1000,
+        tool_call_delay=args.tool_call_ms / 1000,
+    )
+
+    results["levels"] = []
+    max_streams = 0
+    concurrency = 1
+    while concurrency <= args.max_concurrency:
+        level = await bench_concurrency(app, concurrency, max(args.requests, concurrency))
+        results["levels"].append(level)
+        print(f"  c={concurrency:<4} TTFB p50/p95/p99 {level['ttfb']['p50_ms']}/"
+              f"{level['ttfb']['p95_ms']}/{level['ttfb']['p99_ms']} ms, "
+              f"total p95 {level['total']['p95_ms']} ms, {level['streams_per_second']} streams/sec")
+        if level["ttfb"]["p95_ms"] > args.ttfb_slo_ms:
+            break
+        max_streams = concurrency
+        concurrency *= 2
+    results["max_concurrent_streams"] = max_streams
+    print(f"Max concurrent streams with p95 TTFB <= {args.ttfb_slo_ms} ms: {max_streams}")
+
+    print("Comparing time to first token by retrieval mode...")
+    results["retrieval_modes"] = await bench_retrieval_modes(app, app_module, args.requests)
+    for mode, level in results["retrieval_modes"].items():
+        print(f"  {mode:<9} TTFB p50/p95 {level['ttfb']['p50_ms']}/{level['ttfb']['p95_ms']} ms")
+
+    app.state.retriever.close()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the /chat/stream hot path")
+    parser.add_argument("--answer-tokens", type=int, default=300, help="Tokens per scripted answer")
+    parser.add_argument("--generator-runs", type=int, default=20, help="Runs for the raw generator benchmark")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--max-concurrency", type=int, default=256, help="Highest concurrency level to try")
+    parser.add_argument("--first-token-ms", type=float, default=50.0, help="Simulated model time to first token")
+    parser.add_argument("--token-ms", type=float, default=2.0, help="Simulated model time per token")
+    parser.add_argument("--tool-call-ms", type=float, default=50.0, help="Simulated model time to emit the tool call")
+    parser.add_argument("--coalesce-ms", type=float, default=0.0, help="STREAM_COALESCE_MS to benchmark with")
+    parser.add_argument("--coalesce-chars", type=int, default=0, help="STREAM_COALESCE_CHARS to benchmark with")
+    parser.add_argument("--ttfb-slo-ms", type=float, default=500.0, help="p95 TTFB budget for max concurrent streams")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Results file (default: bench_results/stream-<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results file to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.output = args.output or Path("bench_results") / f"stream-{git_commit()}.json"
+
+    results = asyncio.run(run(args))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
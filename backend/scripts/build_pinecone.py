@@ -11,8 +11,35 @@ from pinecone import ServerlessSpec
 import time
 import os
 import hashlib
+import json
+import argparse
+import itertools
+import random
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from tqdm import tqdm
 
+# Shared index modules live in the backend root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from chunk_store import CHUNKS_FILE, SLIM_METADATA_FORMAT, ChunkStoreWriter, slim_metadata
+from lexical_index import LEXICAL_FILE, LexicalIndexWriter
+from local_index import LocalIndexWriter
+from project_catalog import ProjectCatalog, catalog_entry
+from url_index import ProjectUrlIndex, project_url
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDING_MODEL = "gemini-embedding-001"
+CHECKPOINT_FILE = "embeddings.checkpoint.jsonl"
+UPSERT_JOURNAL_FILE = "upsert_failures.jsonl"
+
+# Substrings of errors that are worth retrying: quota/rate limits and transient server errors
+RETRYABLE_ERROR_MARKERS = (
+    "429", "resource_exhausted", "resource exhausted", "quota", "rate limit",
+    "500", "502", "503", "504", "unavailable", "deadline", "timeout", "timed out",
+)
+
 def extract_yaml_frontmatter(content: str):
     """Extract YAML frontmatter from markdown content"""
     # Match YAML frontmatter between --- delimiters
@@ -31,7 +58,10 @@ def extract_yaml_frontmatter(content: str):
     return {}, content
 
 def sanitize_metadata(metadata: dict) -> dict:
-    """Convert metadata values to Pinecone-compatible types (str, int, float, bool)"""
+    """
+    Convert metadata values to Pinecone-compatible types (str, int, float, bool,
+    list of str). Tags are lower-cased so they can be filtered on exactly.
+    """
     from datetime import date, datetime
     
     sanitized = {}
@@ -43,7 +73,9 @@ def sanitize_metadata(metadata: dict) -> dict:
         elif isinstance(value, (str, int, float, bool)):
             sanitized[key] = value
         elif isinstance(value, (list, tuple)):
-            sanitized[key] = ", ".join(str(v) for v in value)
+            sanitized[key] = [str(v) for v in value if v is not None]
+            if key == 'tags':
+                sanitized[key] = [tag.strip().lower() for tag in sanitized[key]]
         elif isinstance(value, dict):
             import json
             sanitized[key] = json.dumps(value)
@@ -74,44 +106,101 @@ def load_markdown_with_metadata(file_path: Path):
     
     return [doc]
 
-def load_documents_from_directory(directory: str):
-    """Load all markdown and PDF files from a directory with proper metadata"""
-    documents = []
+def load_pdf_with_metadata(pdf_path: Path):
+    """Load a PDF file, one document per page"""
+    loader = PyPDFLoader(str(pdf_path))
+    docs = loader.load()
+    # Add metadata to each document
+    for doc in docs:
+        doc.metadata.update({
+            'file_name': pdf_path.name,
+            'file_type': 'pdf',
+            'source': str(pdf_path),
+            'page': doc.metadata.get('page', 0),
+            'type': 'profile' if 'cv' in pdf_path.name.lower() else 'general'
+        })
+    return docs
+
+def list_source_files(directory: str):
+    """All markdown and PDF files under a directory, in a stable order"""
+    root = Path(directory)
+    return sorted(root.rglob("*.md")) + sorted(root.rglob("*.pdf"))
+
+def load_file(path: Path):
+    """
+    Parse one markdown or PDF file. Runs in worker processes, so errors are
+    returned rather than raised to keep per-file reporting in the parent.
     
-    # Load markdown files with YAML frontmatter support
-    print("Loading markdown files...")
-    md_files = list(Path(directory).rglob("*.md"))
-    for md_path in md_files:
-        try:
-            docs = load_markdown_with_metadata(md_path)
-            print(f"  Loaded {md_path.name}: {docs[0].metadata.get('type', 'unknown')} type")
-            documents.extend(docs)
-        except Exception as e:
-            print(f"  Error loading {md_path.name}: {e}")
+    Returns:
+        Tuple (documents, error message or None)
+    """
+    try:
+        if path.suffix == '.pdf':
+            return load_pdf_with_metadata(path), None
+        # Markdown files with YAML frontmatter support
+        return load_markdown_with_metadata(path), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+def iter_loaded_files(files, workers=1):
+    """
+    Yield (path, documents, error) for each file, in input order.
     
-    # Load PDF files
-    print("\nLoading PDF files...")
-    pdf_files = list(Path(directory).rglob("*.pdf"))
-    for pdf_path in pdf_files:
-        try:
-            loader = PyPDFLoader(str(pdf_path))
-            docs = loader.load()
-            # Add metadata to each document
-            for doc in docs:
-                doc.metadata.update({
-                    'file_name': pdf_path.name,
-                    'file_type': 'pdf',
-                    'source': str(pdf_path),
-                    'page': doc.metadata.get('page', 0),
-                    'type': 'profile' if 'cv' in pdf_path.name.lower() else 'general'
-                })
-            documents.extend(docs)
-            print(f"  Loaded {pdf_path.name}: {len(docs)} pages")
-        except Exception as e:
-            print(f"  Error loading {pdf_path.name}: {e}")
+    With workers > 1 files are parsed in a process pool (PDF text extraction is
+    CPU-bound). At most 2 x workers files are parsed ahead of the consumer, so
+    results don't pile up in memory.
+    """
+    if workers <= 1:
+        for path in files:
+            yield (path, *load_file(path))
+        return
     
-    print(f"\nLoaded {len(documents)} documents total")
-    return documents
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for path in files:
+            in_flight.append((path, executor.submit(load_file, path)))
+            if len(in_flight) >= 2 * workers:
+                path, future = in_flight.popleft()
+                yield (path, *future.result())
+        while in_flight:
+            path, future = in_flight.popleft()
+            yield (path, *future.result())
+
+def load_documents_from_directory(directory: str, files=None, workers=1, failed=None):
+    """
+    Load markdown and PDF files from a directory with proper metadata,
+    yielding each file's documents as soon as it has been parsed
+
+    Args:
+        directory: Documents directory
+        files: Optional subset of files to load (defaults to every file in the directory)
+        workers: Number of parser processes (1 parses serially in this process)
+        failed: Optional set that the paths of files that failed to load are added to
+    """
+    loaded = 0
+    errors = []
+    files = list_source_files(directory) if files is None else files
+    
+    print(f"Loading documents{f' with {workers} worker processes' if workers > 1 else ''}...")
+    for path, docs, error in iter_loaded_files(files, workers):
+        if error:
+            tqdm.write(f"  Error loading {path.name}: {error}")
+            errors.append((path, error))
+            if failed is not None:
+                failed.add(str(path))
+            continue
+        if path.suffix == '.pdf':
+            tqdm.write(f"  Loaded {path.name}: {len(docs)} pages")
+        else:
+            tqdm.write(f"  Loaded {path.name}: {docs[0].metadata.get('type', 'unknown')} type")
+        loaded += len(docs)
+        yield from docs
+    
+    print(f"\nLoaded {loaded} documents total")
+    if errors:
+        print(f"Failed to load {len(errors)} files:")
+        for path, error in errors:
+            print(f"  {path}: {error}")
 
 def get_chunking_config(doc_type: str):
     """Get appropriate chunking configuration based on document type"""
@@ -136,38 +225,33 @@ def get_chunking_config(doc_type: str):
     return configs.get(doc_type, configs['default'])
 
 def smart_chunk_documents(documents):
-    """Chunk documents with type-specific strategies"""
-    all_chunks = []
+    """Chunk documents with type-specific strategies, yielding chunks as each document is split"""
+    splitters = {}
     
     for doc in documents:
         doc_type = doc.metadata.get('type', 'default')
         config = get_chunking_config(doc_type)
         
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=config['chunk_size'],
-            chunk_overlap=config['chunk_overlap'],
-            length_function=len,
-            separators=["\n## ", "\n### ", "\n\n", "\n", ". ", " ", ""]  # Split on headers first
-        )
+        key = (config['chunk_size'], config['chunk_overlap'])
+        if key not in splitters:
+            splitters[key] = RecursiveCharacterTextSplitter(
+                chunk_size=config['chunk_size'],
+                chunk_overlap=config['chunk_overlap'],
+                length_function=len,
+                separators=["\n## ", "\n### ", "\n\n", "\n", ". ", " ", ""]  # Split on headers first
+            )
         
-        chunks = text_splitter.split_documents([doc])
-        all_chunks.extend(chunks)
-    
-    return all_chunks
+        yield from splitters[key].split_documents([doc])
 
-def print_metadata_summary(documents):
-    """Print summary of metadata found in documents"""
-    print("\nMetadata Summary:")
-    print("=" * 50)
-    
-    # Group by type
-    types = {}
-    technologies = set()
-    tags = set()
+def collect_metadata_summary(documents, summary):
+    """Pass documents through, accumulating the metadata summary as they stream by"""
+    summary.setdefault('types', {})
+    summary.setdefault('technologies', set())
+    summary.setdefault('tags', set())
     
     for doc in documents:
         doc_type = doc.metadata.get('type', 'unknown')
-        types[doc_type] = types.get(doc_type, 0) + 1
+        summary['types'][doc_type] = summary['types'].get(doc_type, 0) + 1
         
         # Collect technologies if present
         if 'technologies_mentioned' in doc.metadata:
@@ -175,13 +259,42 @@ def print_metadata_summary(documents):
             if isinstance(tech, dict):
                 for category, items in tech.items():
                     if isinstance(items, list):
-                        technologies.update(items)
+                        summary['technologies'].update(items)
         
         # Collect tags if present
         if 'tags' in doc.metadata:
             doc_tags = doc.metadata['tags']
             if isinstance(doc_tags, list):
-                tags.update(doc_tags)
+                summary['tags'].update(doc_tags)
+        
+        yield doc
+
+def collect_project_urls(documents, projects):
+    """Pass documents through, recording each source file's project live URLs in `projects`"""
+    for doc in documents:
+        entry = project_url(doc.metadata)
+        file_projects = projects.setdefault(doc.metadata.get('source', 'unknown'), {})
+        if entry:
+            file_projects[entry[0]] = entry[1]
+        yield doc
+
+def collect_project_catalog(documents, catalog):
+    """Pass documents through, recording each source file's project metadata in `catalog`"""
+    for doc in documents:
+        entry = catalog_entry(doc.metadata)
+        file_catalog = catalog.setdefault(doc.metadata.get('source', 'unknown'), {})
+        if entry:
+            file_catalog[entry[0]] = entry[1]
+        yield doc
+
+def print_metadata_summary(summary):
+    """Print summary of metadata found in documents"""
+    print("\nMetadata Summary:")
+    print("=" * 50)
+    
+    types = summary.get('types', {})
+    technologies = summary.get('technologies', set())
+    tags = summary.get('tags', set())
     
     print(f"\nDocument Types:")
     for doc_type, count in types.items():
@@ -196,102 +309,470 @@ def print_metadata_summary(documents):
         print(f"  All tags: {sorted(tags)}")
 
 
-def generate_chunk_id(chunk, index):
-    """Generate a unique, deterministic ID for each chunk"""
-    content_hash = hashlib.md5(chunk.page_content.encode()).hexdigest()[:8]
+def generate_chunk_id(chunk):
+    """
+    Generate a stable, content-addressed ID for each chunk.
+    The ID depends only on the chunk's source (and page), its text and the
+    metadata stored on its vector, so editing one file never changes the IDs
+    of chunks from other files, while a frontmatter-only edit (new tags)
+    still gives its chunks new vectors.
+    """
     source = chunk.metadata.get('source', 'unknown')
     source_hash = hashlib.md5(source.encode()).hexdigest()[:8]
-    return f"{source_hash}_{index}_{content_hash}"
+    page = chunk.metadata.get('page', '')
+    vector_metadata = json.dumps(slim_metadata(chunk.metadata), sort_keys=True, default=str)
+    content_hash = hashlib.sha256(f"{page}\n{vector_metadata}\n{chunk.page_content}".encode()).hexdigest()[:16]
+    return f"{source_hash}_{content_hash}"
+
+def is_retryable_error(error):
+    """Quota/rate-limit errors and transient server errors are worth retrying"""
+    message = f"{type(error).__name__}: {error}".lower()
+    return any(marker in message for marker in RETRYABLE_ERROR_MARKERS)
+
+def embed_with_backoff(embeddings_model, texts, max_retries=6, base_delay=2.0, max_delay=60.0):
+    """Embed one batch, backing off exponentially (with jitter) on quota and transient errors"""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings_model.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable_error(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            tqdm.write(f"  Embedding batch failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+class EmbeddingCheckpoint:
+    """
+    Append-only JSONL file of embedded chunks, written as each batch completes.
+    Chunk IDs are content-addressed, so an interrupted build can resume by
+    skipping every chunk already in the checkpoint. Only the file offset of
+    each record is kept in memory; embeddings are read back on demand.
+    """
+    
+    def __init__(self, path: Path, model: str):
+        self.path = Path(path)
+        self.model = model
+        self.offsets = {}
+        self._reader = None
+        
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline() or b'{}')
+                if header.get('model') == model:
+                    while True:
+                        offset = f.tell()
+                        line = f.readline()
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # End of file, or a partially written line from an interrupted run
+                        self.offsets[record['id']] = offset
+            if self.offsets:
+                print(f"Resuming from checkpoint: {len(self.offsets)} chunks already embedded")
+        
+        if not self.offsets:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'model': model}) + '\n')
+    
+    def get(self, chunk_id):
+        offset = self.offsets.get(chunk_id)
+        if offset is None:
+            return None
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())['embedding']
+    
+    def append(self, chunk_ids, embeddings):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for chunk_id, embedding in zip(chunk_ids, embeddings):
+                f.write(json.dumps({'id': chunk_id, 'embedding': embedding}) + '\n')
+    
+    def remove(self):
+        """Delete the checkpoint once the build has been written out"""
+        if self._reader is not None:
+            self._reader.close()
+        self.path.unlink(missing_ok=True)
 
-def prepare_pinecone_vectors(chunks, embeddings_model):
+def embed_chunks(chunks, embeddings_model, batch_size=50, max_in_flight=4,
+                 max_retries=6, checkpoint=None):
     """
-    Generate embeddings and format chunks for Pinecone upsert
+    Stream (chunk_id, chunk, embedding) as embedding batches complete.
     
     Args:
-        chunks: List of LangChain Document objects
+        chunks: Iterable of LangChain Document objects
         embeddings_model: Embeddings model (e.g., GoogleGenerativeAIEmbeddings)
+        batch_size: Chunks per embedding request
+        max_in_flight: Maximum number of concurrent embedding requests
+        max_retries: Retries per batch on quota/transient errors
+        checkpoint: Optional EmbeddingCheckpoint to resume from and record into
+    """
+    total = len(chunks) if hasattr(chunks, '__len__') else None
+    progress = tqdm(total=total, unit="chunk", desc="Embedding")
+    pending = set()
+    
+    def embed_batch(batch):
+        texts = [chunk.page_content for _, chunk in batch]
+        return batch, embed_with_backoff(embeddings_model, texts, max_retries=max_retries)
+    
+    def drain(limit):
+        """Yield finished batches until at most `limit` are still in flight"""
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                batch, embeddings = future.result()
+                if checkpoint is not None:
+                    checkpoint.append([chunk_id for chunk_id, _ in batch], embeddings)
+                progress.update(len(batch))
+                for (chunk_id, chunk), embedding in zip(batch, embeddings):
+                    yield chunk_id, chunk, embedding
+    
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        try:
+            batch = []
+            for chunk in chunks:
+                chunk_id = generate_chunk_id(chunk)
+                embedding = checkpoint.get(chunk_id) if checkpoint is not None else None
+                if embedding is not None:
+                    progress.update(1)
+                    yield chunk_id, chunk, embedding
+                    continue
+                
+                batch.append((chunk_id, chunk))
+                if len(batch) == batch_size:
+                    yield from drain(max_in_flight - 1)
+                    pending.add(executor.submit(embed_batch, batch))
+                    batch = []
+            
+            if batch:
+                pending.add(executor.submit(embed_batch, batch))
+            yield from drain(0)
+        finally:
+            for future in pending:
+                future.cancel()
+            progress.close()
+
+def prepare_pinecone_vectors(chunks, embeddings_model, **pipeline_options):
+    """
+    Generate embeddings and format chunks for Pinecone upsert.
+    Vectors only carry the filter fields; text and the rest of the metadata
+    go to the chunk store (see `index_chunks`).
     
-    Returns:
-        List of tuples (id, embedding, metadata)
+    Args:
+        chunks: Iterable of LangChain Document objects
+        embeddings_model: Embeddings model (e.g., GoogleGenerativeAIEmbeddings)
+        **pipeline_options: Batching/concurrency/checkpoint options for `embed_chunks`
+    
+    Yields:
+        Tuples (id, embedding, metadata) as their embedding batch completes
+    """
+    for vector_id, chunk, embedding in embed_chunks(chunks, embeddings_model, **pipeline_options):
+        yield vector_id, embedding, slim_metadata(chunk.metadata)
+
+def index_chunks(chunks, lexical_writer, chunk_writer):
     """
-    print(f"\nGenerating embeddings for {len(chunks)} chunks...")
-    vectors = []
+    Pass chunks through, adding each one to the BM25 index and the chunk store.
+    This runs before already-indexed chunks are skipped, so a changed file's
+    unchanged chunks are kept too.
+    """
+    for chunk in chunks:
+        chunk_id = generate_chunk_id(chunk)
+        lexical_writer.add(chunk_id, chunk.page_content, chunk.metadata)
+        chunk_writer.add(chunk_id, chunk.page_content, chunk.metadata)
+        yield chunk
+
+class UpsertFailed(Exception):
+    """An upsert batch that failed for good, after `retries` retries"""
     
-    # Extract texts for batch embedding
-    texts = [chunk.page_content for chunk in chunks]
+    def __init__(self, error, retries):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.retries = retries
+
+def upsert_with_retry(index, batch, max_retries=3, base_delay=1.0, max_delay=30.0):
+    """
+    Upsert one batch, retrying rate-limit and transient errors with exponential
+    backoff (with jitter). Other errors - a dimension mismatch or oversized
+    metadata - would fail the same way again, so they aren't retried.
     
-    # Generate embeddings in batch (more efficient)
-    embeddings = embeddings_model.embed_documents(texts)
+    Returns:
+        Number of retries that were needed
     
-    # Prepare vectors with IDs and metadata
-    for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-        vector_id = generate_chunk_id(chunk, idx)
-        
-        # Prepare metadata - Pinecone supports string, number, boolean, list of strings
-        metadata = {
-            'text': chunk.page_content[:1000],  # Store first 1000 chars for preview
-            'full_text': chunk.page_content,  # Store full text
-            **chunk.metadata
-        }
-        
-        vectors.append((vector_id, embedding, metadata))
+    Raises:
+        UpsertFailed: if the batch could not be upserted
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            index.upsert(vectors=batch)
+            return attempt
+        except Exception as e:
+            if attempt == max_retries or not is_retryable_error(e):
+                raise UpsertFailed(e, attempt) from e
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            tqdm.write(f"  Upsert batch failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+class UpsertJournal:
+    """
+    JSONL journal of batches that still failed after retries.
+    Each entry holds the full batch (ids, values, metadata), so it can be
+    replayed later with --replay-journal without re-embedding anything.
+    """
     
-    return vectors
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.failed_batches = 0
+    
+    def record(self, batch_id, batch, error):
+        self.failed_batches += 1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'batch_id': batch_id,
+                'error': str(error),
+                'vectors': [list(vector) for vector in batch],
+            }) + '\n')
+    
+    def read_batches(self):
+        """Load the journalled batches and clear the journal, ready to re-record failures"""
+        if not self.path.exists():
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        self.path.unlink()
+        return [[tuple(vector) for vector in entry['vectors']] for entry in entries]
 
-def upsert_to_pinecone(index, vectors, batch_size=100):
+def upsert_to_pinecone(index, vectors, batch_size=100, parallelism=4, max_retries=3, journal=None):
     """
-    Upsert vectors to Pinecone in batches
+    Upsert vectors to Pinecone in batches, pipelined over a thread pool
     
     Args:
         index: Pinecone index object
-        vectors: List of tuples (id, embedding, metadata)
+        vectors: Iterable of tuples (id, embedding, metadata)
         batch_size: Number of vectors to upsert at once
-    """
-    print(f"\nUpserting {len(vectors)} vectors to Pinecone...")
+        parallelism: Maximum number of batches in flight
+        max_retries: Retries per batch before it is written to the journal
+        journal: Optional UpsertJournal recording batches that still failed
     
-    for i in tqdm(range(0, len(vectors), batch_size)):
-        batch = vectors[i:i + batch_size]
+    Returns:
+        Dict of throughput stats, with the IDs of vectors that failed in `failed_ids`
+    """
+    print(f"\nUpserting vectors to Pinecone ({parallelism} parallel batches of {batch_size})...")
+    
+    stats = {'vectors': 0, 'batches': 0, 'retries': 0, 'failed_batches': 0, 'failed_vectors': 0,
+             'failed_ids': set()}
+    progress = tqdm(unit="vector", desc="Upserting")
+    pending = {}
+    batch_ids = itertools.count(1)
+    start_time = time.perf_counter()
+    
+    def drain(limit):
+        """Collect finished batches until at most `limit` are still in flight"""
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_id, batch = pending.pop(future)
+                try:
+                    stats['retries'] += future.result()
+                    stats['vectors'] += len(batch)
+                except UpsertFailed as e:
+                    tqdm.write(f"  Batch {batch_id} failed after {e.retries} retries: {e}")
+                    stats['retries'] += e.retries
+                    stats['failed_batches'] += 1
+                    stats['failed_vectors'] += len(batch)
+                    stats['failed_ids'].update(vector[0] for vector in batch)
+                    if journal is not None:
+                        journal.record(batch_id, batch, e)
+                stats['batches'] += 1
+                progress.update(len(batch))
+    
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        def submit(batch):
+            drain(parallelism - 1)
+            future = executor.submit(upsert_with_retry, index, batch, max_retries)
+            pending[future] = (next(batch_ids), batch)
         
-        try:
-            index.upsert(vectors=batch)
-        except Exception as e:
-            print(f"\nError upserting batch {i//batch_size + 1}: {e}")
-            # Retry logic
-            time.sleep(1)
-            try:
-                index.upsert(vectors=batch)
-            except Exception as retry_error:
-                print(f"Retry failed: {retry_error}")
-                continue
-    
-    print("\nUpsert complete!")
+        batch = []
+        for vector in vectors:
+            batch.append(vector)
+            if len(batch) == batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        drain(0)
+    progress.close()
+    
+    elapsed = time.perf_counter() - start_time
+    stats['seconds'] = round(elapsed, 2)
+    stats['vectors_per_second'] = round(stats['vectors'] / elapsed, 1) if elapsed > 0 else 0.0
+    
+    print(
+        f"\nUpsert complete: {stats['vectors']} vectors in {stats['batches']} batches, "
+        f"{stats['seconds']}s ({stats['vectors_per_second']} vectors/sec), {stats['retries']} retries"
+    )
+    if stats['failed_batches']:
+        journal_note = f", journalled to {journal.path} (replay with --replay-journal)" if journal else ""
+        print(f"WARNING: {stats['failed_batches']} batches ({stats['failed_vectors']} vectors) failed{journal_note}")
     
     # Get index stats
-    stats = index.describe_index_stats()
-    print(f"Total vectors in index: {stats.total_vector_count}")
+    index_stats = index.describe_index_stats()
+    print(f"Total vectors in index: {index_stats.total_vector_count}")
+    return stats
 
-def main():
-    """Main function to orchestrate the entire pipeline"""
-    
+def list_pinecone_ids(index):
+    """Every vector ID in the index, listed page by page"""
+    return {vector_id for page in index.list() for vector_id in page}
 
+def delete_from_pinecone(index, vector_ids, batch_size=1000):
+    """Delete vectors that no longer correspond to any chunk"""
+    vector_ids = list(vector_ids)
+    print(f"\nDeleting {len(vector_ids)} stale vectors from Pinecone...")
+    for i in range(0, len(vector_ids), batch_size):
+        index.delete(ids=vector_ids[i:i + batch_size])
 
-    # Configuration
-    DOCS_DIRECTORY = "./documents"  # Change this to your directory
-    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-    INDEX_NAME = "portfolio"
-    EMBEDDING_DIMENSION = 3072  # For Google's gemini-embedding-001 model
-    
-    # Step 1: Initialize Pinecone
+def hash_file(path: Path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def indexing_fingerprint(backend: str, embedding_model: str):
+    """
+    Hash of everything besides file contents that determines the chunk vectors.
+    If it changes (new model, chunk sizes or backend) nothing from the previous
+    build can be reused.
+    """
+    config = {
+        'backend': backend,
+        'embedding_model': embedding_model,
+        'chunking': {t: get_chunking_config(t) for t in ('profile', 'project', 'application', 'default')},
+        # 2: list metadata (tags) stored as lists of strings for filtering
+        # 3: vectors carry only filter fields, text lives in the chunk store
+        'metadata_format': SLIM_METADATA_FORMAT,
+        # 2: chunk IDs cover the vector metadata, so vectors left stale by earlier
+        # frontmatter-only edits are replaced
+        'chunk_ids': 2,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+def load_manifest(index_dir: str):
+    """Load the map of source files to content hashes and chunk IDs from the last build"""
+    try:
+        with open(Path(index_dir) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {'fingerprint': None, 'files': {}}
+
+def save_manifest(index_dir: str, fingerprint: str, files: dict):
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(index_dir) / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'files': files}, f, indent=2, sort_keys=True)
+
+def plan_index_update(source_files, manifest, fingerprint, incremental, reread_all=False):
+    """
+    Work out which files need re-chunking by comparing content hashes with the manifest.
+    With `reread_all` every file is re-chunked, still reusing indexed chunks by ID.
+
+    Returns:
+        (file_hashes, changed_files, reusable) where `reusable` holds the manifest
+        entries of the previous build that are still valid for this one
+    """
+    file_hashes = {str(path): hash_file(path) for path in source_files}
+    reusable = manifest['files'] if incremental and manifest.get('fingerprint') == fingerprint else {}
+    if incremental and not reusable and manifest['files']:
+        print("Index configuration changed since the last build, rebuilding everything")
+
+    # Entries from builds before the project URL/metadata catalogs existed are
+    # re-read (their chunks are still reused by ID, so nothing is re-embedded)
+    changed_files = [
+        path for path in source_files
+        if reusable.get(str(path), {}).get('hash') != file_hashes[str(path)]
+        or 'projects' not in reusable.get(str(path), {})
+        or 'catalog' not in reusable.get(str(path), {})
+        or reread_all
+    ]
+    print(f"{len(changed_files)} of {len(source_files)} files changed since the last build")
+    return file_hashes, changed_files, reusable
+
+def select_new_chunks(chunks, reusable_ids, chunk_ids):
+    """
+    Pass through chunks that need embedding, skipping ones already indexed by a
+    reusable previous build (and duplicates). Records every chunk's ID per source
+    in `chunk_ids` for the manifest.
+    """
+    seen = set()
+    for chunk in chunks:
+        chunk_id = generate_chunk_id(chunk)
+        chunk_ids.setdefault(chunk.metadata['source'], set()).add(chunk_id)
+        if chunk_id in reusable_ids or chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        yield chunk
+
+def write_build_info(index_dir: str, vector_ids, files):
+    """
+    Record the index build version for the backend's retrieval cache.
+    The version is a hash of the indexed chunk IDs and the source file
+    hashes, so rebuilding an unchanged corpus keeps the same version and
+    cached results stay valid, while any edit - including one that only
+    changes a project's URL or catalog entry - gives a new version and
+    servers reload the index.
+    """
+    content = {
+        'chunk_ids': sorted(vector_ids),
+        'files': {path: entry['hash'] for path, entry in sorted(files.items())},
+    }
+    version = hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+    build_info = {
+        'version': version,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'num_vectors': len(vector_ids),
+        # The backend refuses to start without chunks.sqlite for slim vector metadata
+        'metadata_format': SLIM_METADATA_FORMAT,
+    }
+
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(index_dir) / "build_info.json", 'w', encoding='utf-8') as f:
+        json.dump(build_info, f, indent=2)
+
+    print(f"\nIndex build version: {version}")
+    print(
+        "Copy INDEX_DIR to the servers, then POST /cache/invalidate with their ADMIN_TOKEN "
+        "to reload the index and drop stale cached results"
+    )
+    return version
+
+def write_project_catalog(index_dir: str, files):
+    """
+    Write the project name -> live URL catalog (projects.json) and the project
+    metadata catalog (catalog.json) the backend loads at startup, from the
+    per-file projects recorded in the manifest.
+    """
+    url_catalog = ProjectUrlIndex()
+    catalog = ProjectCatalog()
+    for entry in files.values():
+        url_catalog.update(entry.get('projects', {}))
+        catalog.update(entry.get('catalog', {}))
+    url_catalog.save(index_dir)
+    catalog.save(index_dir)
+    print(f"Project URL catalog: {len(url_catalog)} projects")
+    print(f"Project metadata catalog: {len(catalog)} projects")
+
+def connect_pinecone_index(api_key: str, index_name: str, dimension: int):
+    """Create the Pinecone index if needed and return a handle to it"""
     print("Initializing Pinecone...")
-    pc = Pinecone(api_key=PINECONE_API_KEY)
+    pc = Pinecone(api_key=api_key)
     
-    # Step 2: Create or connect to index
     try:
-        if INDEX_NAME not in pc.list_indexes().names():
-            print(f"Creating new index: {INDEX_NAME}")
+        if index_name not in pc.list_indexes().names():
+            print(f"Creating new index: {index_name}")
             pc.create_index(
-                name=INDEX_NAME,
-                dimension=EMBEDDING_DIMENSION,
+                name=index_name,
+                dimension=dimension,
                 metric="cosine",
                 spec=ServerlessSpec(
                     cloud="aws",
@@ -301,40 +782,228 @@ def main():
             # Wait for index to be ready
             time.sleep(10)
         else:
-            print(f"Index {INDEX_NAME} already exists")
+            print(f"Index {index_name} already exists")
     except Exception as e:
         print(f"Index creation note: {e}")
     
-    index = pc.Index(INDEX_NAME)
+    return pc.Index(index_name)
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def non_negative_int(value):
+    """argparse type for counts that may be 0, such as retries"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, got {value}")
+    return number
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the portfolio vector index")
+    parser.add_argument(
+        "--backend",
+        choices=["pinecone", "local", "both"],
+        default=os.getenv("VECTOR_BACKEND", "pinecone"),
+        help="Where to write vectors: the Pinecone index, the local NumPy index in INDEX_DIR, or both",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-embed chunks of files whose content changed since the last build",
+    )
+    parser.add_argument("--load-workers", type=int, default=1,
+                        help="Processes used to parse PDF and markdown files (1 = serial)")
+    parser.add_argument("--embed-batch-size", type=positive_int, default=50,
+                        help="Chunks per embedding request")
+    parser.add_argument("--embed-concurrency", type=positive_int, default=4,
+                        help="Maximum concurrent embedding requests")
+    parser.add_argument("--embed-max-retries", type=non_negative_int, default=6,
+                        help="Retries per embedding batch on quota/transient errors")
+    parser.add_argument("--upsert-batch-size", type=positive_int, default=100,
+                        help="Vectors per Pinecone upsert request")
+    parser.add_argument("--upsert-parallelism", type=positive_int, default=4,
+                        help="Maximum concurrent Pinecone upsert requests")
+    parser.add_argument("--upsert-max-retries", type=non_negative_int, default=3,
+                        help="Retries per upsert batch before it is journalled")
+    parser.add_argument("--replay-journal", action="store_true",
+                        help="Only re-upsert the batches recorded in the upsert failure journal")
+    return parser.parse_args()
+
+def main():
+    """Main function to orchestrate the entire pipeline"""
+    args = parse_args()
+
+    # Configuration
+    DOCS_DIRECTORY = "./documents"  # Change this to your directory
+    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+    INDEX_NAME = "portfolio"
+    INDEX_DIR = os.getenv("INDEX_DIR", "./index")  # Local build artifacts read by the backend
+    EMBEDDING_DIMENSION = 3072  # For Google's gemini-embedding-001 model
     
-    # Step 3: Initialize embeddings model
+    # Step 1: Connect to (or create) the Pinecone index
+    index = None
+    if args.backend in ("pinecone", "both"):
+        index = connect_pinecone_index(PINECONE_API_KEY, INDEX_NAME, EMBEDDING_DIMENSION)
+    
+    journal = UpsertJournal(Path(INDEX_DIR) / UPSERT_JOURNAL_FILE)
+    if args.replay_journal:
+        if index is None:
+            print("--replay-journal needs the Pinecone backend")
+            return
+        batches = journal.read_batches()
+        print(f"Replaying {len(batches)} journalled batches...")
+        upsert_to_pinecone(
+            index,
+            (vector for batch in batches for vector in batch),
+            batch_size=args.upsert_batch_size,
+            parallelism=args.upsert_parallelism,
+            max_retries=args.upsert_max_retries,
+            journal=journal,
+        )
+        return
+    
+    # Step 2: Initialize embeddings model
     print("\nInitializing embeddings model...")
     embeddings = GoogleGenerativeAIEmbeddings(
-        model="gemini-embedding-001",
+        model=EMBEDDING_MODEL,
     )
     
-    # Step 4: Load documents
-    documents = load_documents_from_directory(DOCS_DIRECTORY)
-    
-    if not documents:
+    # Step 3: Compare source file hashes against the last build's manifest
+    source_files = list_source_files(DOCS_DIRECTORY)
+    if not source_files:
         print("No documents found!")
         return
     
-    # Step 5: Print metadata summary
-    print_metadata_summary(documents)
+    manifest = load_manifest(INDEX_DIR)
+    fingerprint = indexing_fingerprint(args.backend, EMBEDDING_MODEL)
+    # Builds from before the lexical index or chunk store existed have no chunk text to merge with
+    local_files_missing = not all(
+        (Path(INDEX_DIR) / name).exists() for name in (LEXICAL_FILE, CHUNKS_FILE)
+    )
+    if local_files_missing and manifest['files']:
+        print("No lexical index or chunk store yet, re-reading all files to build them")
+    file_hashes, changed_files, reusable = plan_index_update(
+        source_files, manifest, fingerprint, args.incremental, reread_all=local_files_missing
+    )
     
-    # Step 6: Chunk documents
-    print("\nChunking documents...")
+    # Steps 4-9 run as one generator pipeline: load -> chunk -> embed -> upsert.
+    # Documents and chunks are pulled through one at a time, so peak memory is set
+    # by the embedding and upsert windows (concurrency x batch size), not corpus size.
+    reusable_ids = {cid for entry in reusable.values() for cid in entry['chunk_ids']}
+    chunk_ids = {}
+    projects = {}
+    catalog = {}
+    summary = {}
+    load_failures = set()
+    
+    # Step 4: Load changed documents
+    documents = load_documents_from_directory(
+        DOCS_DIRECTORY, files=changed_files, workers=args.load_workers, failed=load_failures
+    )
+    documents = collect_metadata_summary(documents, summary)
+    documents = collect_project_urls(documents, projects)
+    documents = collect_project_catalog(documents, catalog)
+    
+    # Step 5: Chunk documents into the BM25 index and chunk store, keeping only
+    # chunks that aren't in the vector index yet for embedding
+    lexical_writer = LexicalIndexWriter(INDEX_DIR, merge_existing=bool(reusable))
+    chunk_writer = ChunkStoreWriter(INDEX_DIR, merge_existing=bool(reusable))
     chunks = smart_chunk_documents(documents)
-    print(f"Created {len(chunks)} chunks")
-    
-    # Step 7: Generate embeddings and prepare vectors
-    vectors = prepare_pinecone_vectors(chunks, embeddings)
+    chunks = index_chunks(chunks, lexical_writer, chunk_writer)
+    new_chunks = select_new_chunks(chunks, reusable_ids, chunk_ids)
+    
+    # Step 6: Generate embeddings and prepare vectors
+    # Completed batches are checkpointed, so an interrupted run resumes where it stopped
+    checkpoint = EmbeddingCheckpoint(Path(INDEX_DIR) / CHECKPOINT_FILE, EMBEDDING_MODEL)
+    vectors = prepare_pinecone_vectors(
+        new_chunks,
+        embeddings,
+        batch_size=args.embed_batch_size,
+        max_in_flight=args.embed_concurrency,
+        max_retries=args.embed_max_retries,
+        checkpoint=checkpoint,
+    )
     
-    # Step 8: Upsert to Pinecone
-    upsert_to_pinecone(index, vectors, batch_size=100)
+    # Step 7: Upsert to Pinecone and/or stream into the local index
+    local_writer = None
+    failed_ids = set()
+    if args.backend in ("local", "both"):
+        local_writer = LocalIndexWriter(INDEX_DIR, merge_existing=bool(reusable))
+        vectors = local_writer.write_through(vectors)
+    if index is not None:
+        failed_ids = upsert_to_pinecone(
+            index,
+            vectors,
+            batch_size=args.upsert_batch_size,
+            parallelism=args.upsert_parallelism,
+            max_retries=args.upsert_max_retries,
+            journal=journal,
+        )['failed_ids']
+    else:
+        for _ in vectors:
+            pass
+    
+    print_metadata_summary(summary)
+    
+    # Step 8: Work out the new manifest and which chunks are stale. Chunks whose upsert
+    # failed are left out and their file's hash isn't recorded, so the next --incremental
+    # run re-reads the file and upserts them again even if the journal is never replayed
+    files = {path: entry for path, entry in reusable.items() if path in file_hashes}
+    for path in changed_files:
+        if str(path) in chunk_ids:
+            complete = not (chunk_ids[str(path)] & failed_ids)
+            files[str(path)] = {
+                'hash': file_hashes[str(path)] if complete else None,
+                'chunk_ids': sorted(chunk_ids[str(path)] - failed_ids),
+                'projects': projects.get(str(path), {}),
+                'catalog': catalog.get(str(path), {}),
+            }
+        # Files that failed to load keep their previous entry in incremental builds, so the
+        # next run retries them. A full build reuses nothing and leaves them out of the
+        # manifest, but their previous vectors are kept (below) until a later run loads them
+    
+    previous_ids = {cid for entry in manifest['files'].values() for cid in entry['chunk_ids']}
+    current_ids = {cid for entry in files.values() for cid in entry['chunk_ids']} | failed_ids
+    stale_ids = previous_ids - current_ids
+    unloaded_ids = {
+        cid for path in load_failures for cid in manifest['files'].get(path, {}).get('chunk_ids', [])
+    } - current_ids
+    if load_failures:
+        print(f"{len(load_failures)} files failed to load; the next --incremental run retries them")
+    print(f"\n{len(current_ids)} chunks indexed, {len(stale_ids)} stale chunks to delete")
+    if failed_ids:
+        print(f"{len(failed_ids)} chunks failed to upsert and are left out of the manifest; "
+              f"--replay-journal or the next --incremental run retries them")
+    
+    # Step 9: Delete stale vectors and finalise the local index, lexical index and chunk store.
+    # A full build replaces the whole Pinecone index, so vectors the manifest doesn't know
+    # about (older chunk ID schemes, or a lost manifest) are stale too - except those of
+    # files that failed to load this time, which are still the best copy of them
+    pinecone_stale_ids = set(stale_ids)
+    if index is not None and not reusable:
+        pinecone_stale_ids |= list_pinecone_ids(index) - current_ids
+    pinecone_stale_ids -= unloaded_ids
+    if index is not None and pinecone_stale_ids:
+        delete_from_pinecone(index, pinecone_stale_ids)
+    if local_writer is not None:
+        local_writer.close(delete_ids=stale_ids)
+        print(f"Local index in {INDEX_DIR} now holds {len(current_ids)} vectors")
+    lexical_writer.close(delete_ids=stale_ids)
+    print(f"Lexical index: {len(lexical_writer.ids)} chunks added or updated")
+    chunk_writer.close(delete_ids=stale_ids)
+    
+    # Step 10: Record the manifest, project URL catalog and build version so servers can
+    # invalidate cached results
+    save_manifest(INDEX_DIR, fingerprint, files)
+    write_project_catalog(INDEX_DIR, files)
+    write_build_info(INDEX_DIR, current_ids, files)
+    checkpoint.remove()
     
     print("\nPipeline complete!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
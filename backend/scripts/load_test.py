@@ -0,0 +1,192 @@
+"""
+Load test /chat/stream against real uvicorn servers to see how throughput scales with worker count.
+
+For each worker count a server is started on the offline benchmark app
+(scripts/bench_app.py: scripted agent, in-memory retrieval, no API keys),
+then `--concurrency` clients stream answers back to back for `--duration`
+seconds. Reports completed streams per second, TTFB and total latency
+percentiles and errors per worker count, and writes them to
+bench_results/load-<commit>.json.
+
+The scripted agent's per-token cost is pure event-loop work (SSE framing,
+middleware, delta tracking), which is what extra workers spread across cores.
+Set --token-ms 0 to make the server CPU-bound.
+
+Usage (from backend/):
+    python scripts/load_test.py --workers 1 2 4 --concurrency 64 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmark_stream import QUESTIONS, git_commit, latency_summary
+from bench_support import chat_body
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def start_server(workers: int, port: int, args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "BENCH_ANSWER_TOKENS": str(args.answer_tokens),
+        "BENCH_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "BENCH_TOKEN_MS": str(args.token_ms),
+        "BENCH_TOOL_CALL_MS": str(args.tool_call_ms),
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "bench_app:app",
+        "--app-dir", str(SCRIPTS_DIR),
+        "--port", str(port),
+        "--workers", str(workers),
+        "--lifespan", "off",
+        "--loop", "auto",
+        "--http", "auto",
+        "--timeout-keep-alive", "75",
+        "--no-access-log",
+        "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, env=env, cwd=SCRIPTS_DIR.parent)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def stream_once(client: httpx.AsyncClient, question: str):
+    """One /chat/stream request read to the end; returns (ttfb, total) in seconds"""
+    start = time.perf_counter()
+    first_byte = None
+    async with client.stream("POST", "/chat/stream", json=chat_body(question)) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_raw():
+            if first_byte is None and chunk:
+                first_byte = time.perf_counter()
+    end = time.perf_counter()
+    return (first_byte or end) - start, end - start
+
+
+async def run_load(base_url: str, concurrency: int, duration: float, warmup: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(60.0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        await wait_until_ready(client)
+        await asyncio.gather(*(stream_once(client, QUESTIONS[i % len(QUESTIONS)]) for i in range(warmup)))
+
+        ttfbs, totals = [], []
+        errors = 0
+        stop_at = time.perf_counter() + duration
+
+        async def worker(i):
+            nonlocal errors
+            n = i
+            while time.perf_counter() < stop_at:
+                try:
+                    ttfb, total = await stream_once(client, QUESTIONS[n % len(QUESTIONS)])
+                    ttfbs.append(ttfb)
+                    totals.append(total)
+                except (httpx.HTTPError, OSError):
+                    errors += 1
+                n += concurrency
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "streams": len(totals),
+        "errors": errors,
+        "streams_per_second": round(len(totals) / elapsed, 2),
+        "ttfb": latency_summary(ttfbs),
+        "total": latency_summary(totals),
+    }
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def run(args):
+    results = {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {k: v for k, v in vars(args).items() if k != "output"},
+        "levels": [],
+    }
+
+    for workers in args.workers:
+        print(f"Starting server with {workers} worker(s)...")
+        server = start_server(workers, args.port, args)
+        try:
+            level = asyncio.run(run_load(
+                f"http://127.0.0.1:{args.port}", args.concurrency, args.duration, args.warmup
+            ))
+        finally:
+            stop_server(server)
+
+        level["workers"] = workers
+        results["levels"].append(level)
+        print(f"  workers={workers:<3} {level['streams_per_second']} streams/sec, "
+              f"TTFB p50/p95 {level['ttfb']['p50_ms']}/{level['ttfb']['p95_ms']} ms, "
+              f"total p95 {level['total']['p95_ms']} ms, {level['errors']} errors")
+
+    base = results["levels"][0]["streams_per_second"] if results["levels"] else 0
+    if base:
+        print("\nScaling vs first worker count:")
+        for level in results["levels"]:
+            print(f"  workers={level['workers']:<3} x{level['streams_per_second'] / base:.2f}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test /chat/stream across worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent streaming clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per worker count")
+    parser.add_argument("--warmup", type=int, default=8, help="Requests sent before measuring")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the test server")
+    parser.add_argument("--answer-tokens", type=int, default=300, help="Tokens per scripted answer")
+    parser.add_argument("--first-token-ms", type=float, default=50.0, help="Simulated model time to first token")
+    parser.add_argument("--token-ms", type=float, default=2.0, help="Simulated model time per token")
+    parser.add_argument("--tool-call-ms", type=float, default=50.0, help="Simulated model time to emit the tool call")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Results file (default: bench_results/load-<commit>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.output = args.output or Path("bench_results") / f"load-{git_commit()}.json"
+
+    results = run(args)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,63 @@
 #!/bin/bash
 set -e
 
+# Usage: scripts/start_server.sh [dev|prod]
+#   dev  (default) single process with auto-reload
+#   prod multiple workers, uvloop/httptools, tuned keep-alive and graceful drain of open streams
+MODE="${1:-dev}"
+
 # Load environment variables and export them
 set -a  # automatically export all variables
 source .env
 set +a  # stop automatically exporting
 
 # Set default host and port
-HOST="127.0.0.1"
-PORT="8000"
+HOST="${HOST:-127.0.0.1}"
+PORT="${PORT:-8000}"
+
+if [ "$MODE" = "dev" ]; then
+    # Launch uvicorn
+    poetry run uvicorn app:app --host $HOST --port $PORT --reload
+    exit 0
+fi
+
+if [ "$MODE" != "prod" ]; then
+    echo "Unknown mode: $MODE (expected dev or prod)" >&2
+    exit 1
+fi
+
+# One worker per core by default; each worker runs lifespan() once at boot and
+# keeps its agent, vector store and caches for its lifetime
+WORKERS="${WEB_CONCURRENCY:-$(nproc 2>/dev/null || echo 2)}"
+
+# Idle keep-alive should outlast the load balancer's idle timeout so the proxy,
+# not uvicorn, closes idle connections (avoids 502s on reused sockets)
+KEEP_ALIVE="${KEEP_ALIVE_TIMEOUT:-75}"
+
+# On SIGTERM open streams get STREAM_DRAIN_SECONDS to finish; uvicorn must wait a bit longer
+GRACEFUL_TIMEOUT="${GRACEFUL_SHUTDOWN_TIMEOUT:-$(( ${STREAM_DRAIN_SECONDS:-25} + 5 ))}"
+
+# uvloop and httptools come with uvicorn[standard]; fall back to the pure-Python ones if missing
+LOOP="uvloop"
+HTTP="httptools"
+if ! poetry run python -c "import uvloop" 2>/dev/null; then
+    echo "uvloop not installed (pip install 'uvicorn[standard]'), using the asyncio loop" >&2
+    LOOP="asyncio"
+fi
+if ! poetry run python -c "import httptools" 2>/dev/null; then
+    echo "httptools not installed (pip install 'uvicorn[standard]'), using h11" >&2
+    HTTP="h11"
+fi
 
-# Launch uvicorn
-poetry run uvicorn app:app --host $HOST --port $PORT --reload
\ No newline at end of file
+# Requests are logged by RequestLoggingMiddleware, so uvicorn's access log is off
+exec poetry run uvicorn app:app \
+    --host $HOST \
+    --port $PORT \
+    --workers $WORKERS \
+    --loop $LOOP \
+    --http $HTTP \
+    --timeout-keep-alive $KEEP_ALIVE \
+    --timeout-graceful-shutdown $GRACEFUL_TIMEOUT \
+    --backlog 2048 \
+    --no-access-log \
+    --proxy-headers
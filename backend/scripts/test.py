@@ -6,7 +6,9 @@ url = "http://127.0.0.1:8000/chat/stream"
 # Headers are often needed for SSE
 headers = {'Accept': 'text/event-stream'}
 body = {
-  "message": "can you tell me what languages Jasper's project s3-mobile uses",
+  "messages": [
+    {"role": "user", "content": "can you tell me what languages Jasper's project s3-mobile uses"}
+  ],
   "temperature": 0.7
 }
 
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_TOTAL = REGISTRY.counter(
+    "portfolio_single_flight_total",
+    "Single-turn chat streams, by role (leader runs the agent, follower shares its run)",
+)
+
+
+class _Flight:
+    """One upstream run and everything it has produced so far"""
+
+    def __init__(self):
+        self.events: List[Dict[str, str]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def notify(self) -> None:
+        # Wake everyone waiting on the current event, then start a new one
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Shares one in-flight event stream between identical concurrent requests.
+
+    The first request for a key (the leader) starts its stream as a
+    background task that appends each event to a buffer. Requests for the
+    same key while it is running (followers) get the buffered events
+    replayed first, then the rest as they arrive. The run stops early only
+    if every subscriber disconnects. Once it finishes the key is free, so
+    later requests start a new run.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: str) -> Optional[AsyncIterator[Dict[str, str]]]:
+        """Subscribe to the run in flight for `key`, or None if there isn't one"""
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        SINGLE_FLIGHT_TOTAL.inc(role="follower")
+        logger.info(f"Joining in-flight stream ({flight.subscribers} subscribers, {len(flight.events)} events so far)")
+        return _Subscription(flight)
+
+    def lead(
+        self,
+        key: str,
+        events: AsyncIterator[Dict[str, str]],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[Dict[str, str]]:
+        """
+        Start `events` as the shared run for `key` and subscribe to it.
+        `on_done` is called once the run finishes, however it ends - even if
+        it is cancelled before it starts.
+        """
+        flight = _Flight()
+        self._flights[key] = flight
+        flight.task = asyncio.ensure_future(self._run(flight, events))
+        flight.task.add_done_callback(lambda _: self._finish(key, flight, on_done))
+        SINGLE_FLIGHT_TOTAL.inc(role="leader")
+        return _Subscription(flight)
+
+    @staticmethod
+    async def _run(flight: _Flight, events: AsyncIterator[Dict[str, str]]) -> None:
+        try:
+            async for event in events:
+                flight.events.append(event)
+                flight.notify()
+        except asyncio.CancelledError:
+            await events.aclose()
+            raise
+        except Exception as e:
+            flight.error = e
+
+    def _finish(self, key: str, flight: _Flight, on_done: Optional[Callable[[], None]]) -> None:
+        flight.done = True
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        flight.notify()
+        if on_done is not None:
+            on_done()
+
+
+class _Subscription:
+    """
+    One subscriber's stream of a flight's events.
+
+    The subscriber is counted from the moment `join()` or `lead()` returns,
+    not from its first read, and leaves exactly once: when the stream ends
+    or fails, when it is cancelled mid-read, or when it is closed - even if
+    it was never read from. The run is cancelled when the last one leaves.
+    """
+
+    def __init__(self, flight: _Flight):
+        self._flight = flight
+        self._events = self._follow(flight)
+        self._left = False
+        flight.subscribers += 1
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, str]:
+        try:
+            return await self._events.__anext__()
+        except BaseException:
+            self._leave()
+            raise
+
+    async def aclose(self) -> None:
+        self._leave()
+        await self._events.aclose()
+
+    def _leave(self) -> None:
+        if self._left:
+            return
+        self._left = True
+        flight = self._flight
+        flight.subscribers -= 1
+        if not flight.subscribers and not flight.done:
+            flight.task.cancel()
+
+    @staticmethod
+    async def _follow(flight: _Flight) -> AsyncIterator[Dict[str, str]]:
+        sent = 0
+        while True:
+            changed = flight.changed
+            while sent < len(flight.events):
+                yield flight.events[sent]
+                sent += 1
+            if flight.done:
+                break
+            await changed.wait()
+        if flight.error is not None:
+            raise flight.error
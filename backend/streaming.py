@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, List, Optional
+
+from sse_starlette.sse import EventSourceResponse
+
+logger = logging.getLogger(__name__)
+
+
+async def coalesce_deltas(
+    deltas: AsyncIterator[str],
+    max_delay: float = 0.0,
+    max_chars: int = 0,
+) -> AsyncIterator[str]:
+    """
+    Merge small text deltas into fewer, larger ones.
+
+    The first delta is passed through straight away so time to first token
+    is unaffected. After that, deltas are buffered and flushed once
+    `max_chars` characters have accumulated or `max_delay` seconds have
+    passed since the oldest buffered delta - whichever comes first. With
+    only `max_chars` set, text waits until the threshold or the end of the
+    stream. With both thresholds at 0 deltas are passed through unchanged.
+
+    The source is drained by a single background task that appends to the
+    buffer, so the per-delta cost is a list append; the consumer only wakes
+    up to flush.
+    """
+    if not max_delay and not max_chars:
+        async for delta in deltas:
+            yield delta
+        return
+
+    loop = asyncio.get_running_loop()
+    buffer: List[str] = []
+    buffered_chars = 0
+    oldest = 0.0
+    eager = True
+    finished = False
+    wake = asyncio.Event()
+
+    async def drain() -> None:
+        nonlocal buffered_chars, oldest, finished
+        try:
+            async for delta in deltas:
+                if not buffer:
+                    oldest = loop.time()
+                    wake.set()
+                buffer.append(delta)
+                buffered_chars += len(delta)
+                if eager or (max_chars and buffered_chars >= max_chars):
+                    wake.set()
+        finally:
+            finished = True
+            wake.set()
+
+    producer = asyncio.ensure_future(drain())
+    try:
+        while True:
+            if buffer and max_delay and not wake.is_set():
+                timeout = oldest + max_delay - loop.time()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            elif not wake.is_set():
+                await wake.wait()
+            wake.clear()
+
+            if buffer and (
+                eager
+                or finished
+                or (max_chars and buffered_chars >= max_chars)
+                or (max_delay and loop.time() >= oldest + max_delay)
+            ):
+                text = "".join(buffer)
+                buffer.clear()
+                buffered_chars = 0
+                eager = False
+                yield text
+
+            if finished and not buffer:
+                break
+
+        # Re-raise anything the source raised, after flushing what it produced
+        await producer
+
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+# Set when the server starts shutting down, so open streams can drain
+_shutdown_event: Optional[asyncio.Event] = None
+_shutdown_loop: Optional[asyncio.AbstractEventLoop] = None
+_shutting_down = False
+
+
+def is_shutting_down() -> bool:
+    """True once the server has been asked to exit"""
+    return _shutting_down
+
+
+def _request_shutdown() -> None:
+    global _shutting_down
+    _shutting_down = True
+    if _shutdown_event is not None and _shutdown_loop is not None:
+        _shutdown_loop.call_soon_threadsafe(_shutdown_event.set)
+
+
+async def wait_for_shutdown() -> None:
+    """Wait until the server is asked to exit"""
+    global _shutdown_event, _shutdown_loop
+    if _shutting_down:
+        return
+    if _shutdown_event is None or _shutdown_loop is not asyncio.get_running_loop():
+        _shutdown_event = asyncio.Event()
+        _shutdown_loop = asyncio.get_running_loop()
+    await _shutdown_event.wait()
+
+
+try:
+    from uvicorn.main import Server
+
+    # Chain onto uvicorn's exit handler (sse_starlette patches it the same way)
+    _original_handle_exit = Server.handle_exit
+
+    def _handle_exit(*args: Any, **kwargs: Any) -> None:
+        _request_shutdown()
+        _original_handle_exit(*args, **kwargs)
+
+    Server.handle_exit = _handle_exit
+except ImportError:
+    logger.debug("Uvicorn not installed, open streams won't be drained on shutdown")
+
+
+class DrainingEventSourceResponse(EventSourceResponse):
+    """
+    EventSourceResponse that lets an in-flight answer finish when the server shuts down.
+
+    The stock response stops streaming as soon as uvicorn receives SIGTERM,
+    cutting answers off mid-sentence. This one keeps streaming for up to
+    `drain_timeout` seconds after the shutdown signal and only then closes
+    the stream. Run uvicorn with a --timeout-graceful-shutdown at least
+    this long so the worker waits for drained streams.
+    """
+
+    def __init__(self, *args: Any, drain_timeout: float = 25.0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.drain_timeout = drain_timeout
+
+    async def _listen_for_exit_signal(self) -> None:
+        await wait_for_shutdown()
+        logger.info(f"Shutdown requested, letting the open stream finish (up to {self.drain_timeout}s)")
+        await asyncio.sleep(self.drain_timeout)
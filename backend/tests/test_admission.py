@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_refills():
+    bucket = TokenBucket(rate=1.0, burst=3)
+    now = bucket.updated
+
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(1.0)
+    assert bucket.take(now + 0.5) == pytest.approx(0.5)
+    assert bucket.take(now + 1.0) == 0.0
+
+
+def test_bucket_never_holds_more_than_burst():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    now = bucket.updated + 60
+
+    assert bucket.full(now)
+    assert bucket.take(now) == 0.0
+    assert bucket.take(now) == 0.0
+    assert bucket.take(now) > 0
+    assert not bucket.full(now)
+
+
+def test_rate_limit_is_per_client(monkeypatch):
+    monkeypatch.setattr(admission.time, "monotonic", lambda: 1000.0)
+    controller = AdmissionController(rate_per_minute=60, burst=2)
+
+    controller.check_rate("a")
+    controller.check_rate("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate("a")
+    assert rejected.value.reason == "rate_limited"
+    assert rejected.value.retry_after == pytest.approx(1.0)
+
+    controller.check_rate("b")
+
+
+def test_idle_clients_are_forgotten_when_the_table_is_full(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    controller = AdmissionController(rate_per_minute=60, burst=1, max_clients=2)
+
+    controller.check_rate("a")
+    controller.check_rate("b")
+    now[0] += 5
+    controller.check_rate("c")
+
+    assert set(controller._buckets) == {"c"}
+
+
+def test_zero_rate_disables_the_rate_limit():
+    controller = AdmissionController(rate_per_minute=0)
+    for _ in range(100):
+        controller.check_rate("a")
+
+
+async def drain(stream):
+    return [event async for event in stream]
+
+
+async def body(*events):
+    for event in events:
+        yield event
+
+
+def test_requests_beyond_the_cap_queue_in_order():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=2)
+        first = controller.admit("a")
+        second = controller.admit("b")
+        third = controller.admit("c")
+        positions = (controller.position(first), controller.position(second), controller.position(third))
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("d")
+        assert rejected.value.reason == "queue_full"
+
+        controller.release(first)
+        admitted = (second.admitted, third.admitted, controller.position(third))
+        controller.release(second)
+        controller.release(third)
+        return positions, admitted, controller.stats()
+
+    positions, admitted, stats = asyncio.run(run())
+    assert positions == (0, 1, 2)
+    assert admitted == (True, False, 1)
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_release_is_idempotent():
+    async def run():
+        controller = AdmissionController(max_concurrent=2)
+        ticket = controller.admit("a")
+        controller.release(ticket)
+        controller.release(ticket)
+        return controller.active
+
+    assert asyncio.run(run()) == 0
+
+
+def test_guard_reports_queue_position_then_streams():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, queue_timeout=5)
+        running = controller.admit("a")
+        queued = controller.admit("b")
+        stream = asyncio.ensure_future(drain(controller.guard(queued, body({"event": "done"}), position_interval=0.01)))
+        await asyncio.sleep(0.05)
+        controller.release(running)
+        events = await stream
+        return events, controller.stats()
+
+    events, stats = asyncio.run(run())
+    assert events[0] == {"event": "busy", "data": '{"position": 1, "queued": 1}'}
+    assert events[-1] == {"event": "done"}
+    assert stats["active"] == 0
+
+
+def test_guard_gives_up_after_the_queue_timeout():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, queue_timeout=0.05)
+        controller.admit("a")
+        queued = controller.admit("b")
+        events = await drain(controller.guard(queued, body({"event": "done"}), position_interval=0.01))
+        return events, controller.stats()
+
+    events, stats = asyncio.run(run())
+    assert events[-1]["event"] == "error"
+    assert {"event": "done"} not in events
+    assert stats["queued"] == 0
+    assert stats["active"] == 1
+
+
+def test_guard_releases_the_slot_when_the_stream_fails():
+    async def failing():
+        yield {"event": "update"}
+        raise RuntimeError("boom")
+
+    async def run():
+        controller = AdmissionController(max_concurrent=1)
+        with pytest.raises(RuntimeError):
+            await drain(controller.guard(controller.admit("a"), failing()))
+        return controller.active
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,171 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from build_pinecone import (  # noqa: E402
+    generate_chunk_id,
+    hash_file,
+    load_manifest,
+    parse_args,
+    plan_index_update,
+    save_manifest,
+    select_new_chunks,
+    write_build_info,
+)
+
+FINGERPRINT = "abc123"
+
+
+def write_sources(tmp_path, **contents):
+    paths = []
+    for name, text in contents.items():
+        path = tmp_path / f"{name}.md"
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+def manifest_for(paths, fingerprint=FINGERPRINT):
+    return {
+        "fingerprint": fingerprint,
+        "files": {
+            str(path): {"hash": hash_file(path), "chunk_ids": [], "projects": {}, "catalog": None}
+            for path in paths
+        },
+    }
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    paths = write_sources(tmp_path, one="first", two="second")
+    manifest = manifest_for(paths)
+    (tmp_path / "two.md").write_text("second, edited")
+
+    file_hashes, changed, reusable = plan_index_update(paths, manifest, FINGERPRINT, incremental=True)
+
+    assert changed == [tmp_path / "two.md"]
+    assert reusable == manifest["files"]
+    assert file_hashes[str(tmp_path / "two.md")] == hash_file(tmp_path / "two.md")
+
+
+def test_new_files_are_read(tmp_path):
+    paths = write_sources(tmp_path, one="first")
+    manifest = manifest_for(paths)
+    paths += write_sources(tmp_path, two="second")
+
+    _, changed, _ = plan_index_update(paths, manifest, FINGERPRINT, incremental=True)
+
+    assert changed == [tmp_path / "two.md"]
+
+
+def test_files_with_failed_chunks_are_read_again(tmp_path):
+    paths = write_sources(tmp_path, one="first", two="second")
+    manifest = manifest_for(paths)
+    manifest["files"][str(paths[0])]["hash"] = None
+
+    _, changed, _ = plan_index_update(paths, manifest, FINGERPRINT, incremental=True)
+
+    assert changed == [paths[0]]
+
+
+def test_changed_configuration_rebuilds_everything(tmp_path):
+    paths = write_sources(tmp_path, one="first", two="second")
+    manifest = manifest_for(paths, fingerprint="old")
+
+    _, changed, reusable = plan_index_update(paths, manifest, FINGERPRINT, incremental=True)
+
+    assert changed == paths
+    assert reusable == {}
+
+
+def test_full_build_reuses_nothing(tmp_path):
+    paths = write_sources(tmp_path, one="first")
+
+    _, changed, reusable = plan_index_update(paths, manifest_for(paths), FINGERPRINT, incremental=False)
+
+    assert changed == paths
+    assert reusable == {}
+
+
+def test_reread_all_keeps_reusable_entries(tmp_path):
+    paths = write_sources(tmp_path, one="first")
+    manifest = manifest_for(paths)
+
+    _, changed, reusable = plan_index_update(paths, manifest, FINGERPRINT, incremental=True, reread_all=True)
+
+    assert changed == paths
+    assert reusable == manifest["files"]
+
+
+def chunk(source, text, **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+
+def test_chunk_ids_depend_on_source_text_and_vector_metadata():
+    assert generate_chunk_id(chunk("a.md", "text")) == generate_chunk_id(chunk("a.md", "text"))
+    assert generate_chunk_id(chunk("a.md", "text")) != generate_chunk_id(chunk("b.md", "text"))
+    assert generate_chunk_id(chunk("a.md", "text")) != generate_chunk_id(chunk("a.md", "other"))
+
+
+def test_frontmatter_edits_change_chunk_ids():
+    tagged = chunk("a.md", "text", type="project", tags=["python", "aws"])
+    assert generate_chunk_id(tagged) != generate_chunk_id(chunk("a.md", "text", type="project", tags=["rust"]))
+    assert generate_chunk_id(tagged) != generate_chunk_id(chunk("a.md", "text", type="profile", tags=["python", "aws"]))
+    # Fields that only live in the chunk store don't need a new vector
+    assert generate_chunk_id(tagged) == generate_chunk_id(
+        chunk("a.md", "text", type="project", tags=["python", "aws"], live_url="https://example.com")
+    )
+
+
+def test_select_new_chunks_skips_indexed_and_duplicate_chunks():
+    indexed = chunk("a.md", "already indexed")
+    new = chunk("a.md", "new")
+    other = chunk("b.md", "other file")
+    chunk_ids = {}
+
+    selected = list(select_new_chunks([indexed, new, new, other], {generate_chunk_id(indexed)}, chunk_ids))
+
+    assert selected == [new, other]
+    assert chunk_ids == {
+        "a.md": {generate_chunk_id(indexed), generate_chunk_id(new)},
+        "b.md": {generate_chunk_id(other)},
+    }
+
+
+def test_manifest_round_trip(tmp_path):
+    files = {"a.md": {"hash": "h", "chunk_ids": ["x"]}}
+    save_manifest(str(tmp_path), FINGERPRINT, files)
+
+    assert load_manifest(str(tmp_path)) == {"fingerprint": FINGERPRINT, "files": files}
+    assert load_manifest(str(tmp_path / "missing")) == {"fingerprint": None, "files": {}}
+
+
+def read_version(index_dir):
+    with open(index_dir / "build_info.json") as f:
+        return json.load(f)["version"]
+
+
+def test_build_version_changes_with_any_source_edit(tmp_path):
+    files = {"a.md": {"hash": "h1", "chunk_ids": ["x"]}}
+    write_build_info(str(tmp_path), {"x"}, files)
+    unchanged = read_version(tmp_path)
+
+    write_build_info(str(tmp_path), {"x"}, files)
+    assert read_version(tmp_path) == unchanged
+
+    # Same chunks, but e.g. the live_url in the frontmatter changed
+    write_build_info(str(tmp_path), {"x"}, {"a.md": {"hash": "h2", "chunk_ids": ["x"]}})
+    assert read_version(tmp_path) != unchanged
+
+
+@pytest.mark.parametrize("flag", ["--embed-max-retries", "--upsert-max-retries"])
+def test_max_retries_must_not_be_negative(monkeypatch, flag):
+    monkeypatch.setattr(sys, "argv", ["build_pinecone.py", flag, "0"])
+    assert getattr(parse_args(), flag[2:].replace("-", "_")) == 0
+
+    monkeypatch.setattr(sys, "argv", ["build_pinecone.py", flag, "-1"])
+    with pytest.raises(SystemExit):
+        parse_args()
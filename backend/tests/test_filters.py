@@ -0,0 +1,60 @@
+import pytest
+
+from filters import build_filter, matches_filter
+
+PROJECT = {"type": "project", "name": "s3-mobile", "tags": ["react-native", "aws"]}
+PROFILE = {"type": "profile"}
+
+
+def test_build_filter():
+    assert build_filter() is None
+    assert build_filter(" Project ") == {"type": {"$eq": "project"}}
+    assert build_filter(tags=["AWS", " "]) == {"tags": {"$in": ["aws"]}}
+    assert build_filter("project", ["aws"]) == {
+        "$and": [{"type": {"$eq": "project"}}, {"tags": {"$in": ["aws"]}}]
+    }
+    assert build_filter(tags=[" "]) is None
+
+
+def test_empty_filter_matches_everything():
+    assert matches_filter(PROJECT, None)
+    assert matches_filter(PROJECT, {})
+
+
+@pytest.mark.parametrize(
+    "metadata_filter, expected",
+    [
+        ({"type": "project"}, True),
+        ({"type": {"$eq": "profile"}}, False),
+        ({"type": {"$ne": "profile"}}, True),
+        ({"type": {"$in": ["profile", "project"]}}, True),
+        ({"type": {"$nin": ["project"]}}, False),
+        ({"tags": {"$eq": "aws"}}, True),
+        ({"tags": {"$in": ["gcp", "aws"]}}, True),
+        ({"tags": {"$nin": ["aws"]}}, False),
+        ({"tags": {"$ne": "gcp"}}, True),
+        ({"$and": [{"type": "project"}, {"tags": {"$in": ["gcp"]}}]}, False),
+        ({"$or": [{"type": "profile"}, {"tags": {"$in": ["aws"]}}]}, True),
+        ({"type": "project", "name": "findkairos"}, False),
+    ],
+)
+def test_operators(metadata_filter, expected):
+    assert matches_filter(PROJECT, metadata_filter) is expected
+
+
+def test_missing_fields():
+    assert not matches_filter(PROFILE, {"tags": {"$eq": "aws"}})
+    assert not matches_filter(PROFILE, {"tags": {"$in": ["aws"]}})
+    assert matches_filter(PROFILE, {"tags": {"$ne": "aws"}})
+    assert matches_filter(PROFILE, {"tags": {"$nin": ["aws"]}})
+
+
+def test_unsupported_operator():
+    with pytest.raises(ValueError):
+        matches_filter(PROJECT, {"type": {"$gt": 1}})
+
+
+def test_build_filter_output_matches_records():
+    metadata_filter = build_filter("project", ["AWS"])
+    assert matches_filter(PROJECT, metadata_filter)
+    assert not matches_filter(PROFILE, metadata_filter)
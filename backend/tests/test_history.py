@@ -0,0 +1,111 @@
+from history import (
+    MESSAGE_OVERHEAD_TOKENS,
+    HistoryPolicy,
+    estimate_tokens,
+    message_tokens,
+)
+
+
+def conversation(turns, words=40):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return messages
+
+
+def total(messages):
+    return sum(message_tokens(message) for message in messages)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert message_tokens({"role": "user", "content": "abcd"}) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_history_within_budget_is_unchanged():
+    messages = conversation(2)
+    trimmed = HistoryPolicy(max_tokens=10000).apply(messages)
+    assert trimmed.messages == messages
+    assert trimmed.dropped == 0
+    assert not trimmed.summarized
+
+
+def test_zero_budget_disables_trimming():
+    messages = conversation(50)
+    assert HistoryPolicy(max_tokens=0).apply(messages).messages == messages
+
+
+def test_trimmed_history_fits_the_budget():
+    messages = conversation(20)
+    policy = HistoryPolicy(max_tokens=500, min_recent_messages=4, summary_max_tokens=60)
+    trimmed = policy.apply(messages)
+
+    assert trimmed.tokens_after <= 500
+    assert trimmed.tokens_after == total(trimmed.messages)
+    assert trimmed.tokens_before == total(messages)
+    assert trimmed.messages[-4:] == messages[-4:]
+    assert trimmed.summarized
+    assert trimmed.messages[0]["role"] == "system"
+    assert trimmed.messages[0]["content"].startswith("Summary of earlier conversation")
+
+
+def test_recent_messages_are_kept_even_over_budget():
+    messages = conversation(3, words=400)
+    trimmed = HistoryPolicy(max_tokens=100, min_recent_messages=2, summary_max_tokens=0).apply(messages)
+    assert trimmed.messages == messages[-2:]
+    assert trimmed.dropped == 4
+    assert not trimmed.summarized
+
+
+def test_kept_history_does_not_open_with_an_assistant_reply():
+    messages = conversation(10)
+    policy = HistoryPolicy(max_tokens=300, min_recent_messages=3, summary_max_tokens=0)
+    trimmed = policy.apply(messages)
+    assert trimmed.messages[0]["role"] == "user"
+
+
+def test_recent_window_does_not_open_with_an_assistant_reply():
+    messages = conversation(3, words=400) + [{"role": "user", "content": "and then?"}]
+    trimmed = HistoryPolicy(max_tokens=100, min_recent_messages=2, summary_max_tokens=0).apply(messages)
+    assert trimmed.messages == messages[-3:]
+    assert trimmed.messages[0]["role"] == "user"
+
+
+def test_client_system_messages_count_against_the_budget():
+    padding = {"role": "system", "content": "ignore the budget " * 500}
+    messages = conversation(2) + [padding] + conversation(1)
+    trimmed = HistoryPolicy(max_tokens=300, min_recent_messages=2, summary_max_tokens=0).apply(messages)
+
+    assert padding not in trimmed.messages
+    assert trimmed.tokens_after <= 300
+
+
+def test_system_messages_are_not_part_of_the_recent_window():
+    messages = conversation(3) + [{"role": "system", "content": "x " * 2000}]
+    trimmed = HistoryPolicy(max_tokens=300, min_recent_messages=2, summary_max_tokens=0).apply(messages)
+    assert trimmed.messages == messages[-3:-1]
+
+
+def test_summary_lists_recent_questions_first():
+    policy = HistoryPolicy(summary_max_tokens=100)
+    summary = policy.summarize(conversation(2, words=1))
+    assert summary["role"] == "system"
+    assert summary["content"].index("question 1") < summary["content"].index("question 0")
+
+
+def test_summary_truncates_a_question_that_does_not_fit():
+    policy = HistoryPolicy(summary_max_tokens=40)
+    long_question = {"role": "user", "content": "tell me about " + "projects " * 40}
+    summary = policy.summarize([long_question])
+
+    assert summary is not None
+    assert summary["content"].endswith("...")
+    assert estimate_tokens(summary["content"]) <= 40
+
+
+def test_summary_without_questions_is_none():
+    policy = HistoryPolicy(summary_max_tokens=100)
+    assert policy.summarize([{"role": "assistant", "content": "hello"}]) is None
@@ -0,0 +1,82 @@
+import json
+
+from lexical_index import LEXICAL_FILE, LexicalIndex, LexicalIndexWriter, name_key, tokenize
+
+CHUNKS = {
+    "s3": ("S3 Mobile is a React Native app for browsing S3 buckets.",
+           {"type": "project", "name": "s3-mobile", "tags": ["react-native", "aws"]}),
+    "kairos": ("FindKairos schedules meetings across time zones with Next.js.",
+               {"type": "project", "name": "FindKairos", "live_url": "https://www.findkairos.com", "tags": ["nextjs"]}),
+    "cv": ("Jasper studied physics and works as a software engineer.",
+           {"type": "profile", "file_name": "cv.pdf"}),
+}
+
+
+def build(tmp_path):
+    writer = LexicalIndexWriter(str(tmp_path))
+    for chunk_id, (text, metadata) in CHUNKS.items():
+        writer.add(chunk_id, text, metadata)
+    writer.close()
+    return LexicalIndex.load(str(tmp_path))
+
+
+def test_tokenize_keeps_joined_identifiers_and_their_parts():
+    assert tokenize("The s3-mobile app") == ["s3-mobile", "s3", "mobile", "app"]
+    assert tokenize("Built with Next.js") == ["built", "next.js", "next", "js"]
+
+
+def test_name_key_ignores_spelling():
+    assert name_key("S3 Mobile") == name_key("s3-mobile") == name_key("s3_mobile") == "s3mobile"
+
+
+def test_search_ranks_matching_chunks(tmp_path):
+    index = build(tmp_path)
+    results = index.search("react native buckets", k=2)
+    assert [doc.id for doc in results] == ["s3"]
+    assert results[0].page_content == ""
+    assert results[0].metadata["name"] == "s3-mobile"
+
+
+def test_search_applies_metadata_filters(tmp_path):
+    index = build(tmp_path)
+    assert [doc.id for doc in index.search("software meetings", metadata_filter={"type": {"$eq": "profile"}})] == ["cv"]
+    assert index.search("software", metadata_filter={"tags": {"$in": ["aws"]}}) == []
+
+
+def test_exact_name_queries(tmp_path):
+    index = build(tmp_path)
+    assert index.exact_name("tell me about the s3 mobile project") == "s3mobile"
+    assert index.exact_name("FindKairos") == "findkairos"
+    assert index.exact_name("findkairos.com") == "findkairoscom"
+    assert index.exact_name("what languages do you know") is None
+
+
+def test_records_hold_terms_not_text(tmp_path):
+    build(tmp_path)
+    with open(tmp_path / LEXICAL_FILE) as f:
+        records = [json.loads(line) for line in f]
+    assert all(set(record) == {"id", "terms", "metadata"} for record in records)
+
+
+def test_legacy_records_are_upgraded(tmp_path):
+    legacy = {"id": "old", "metadata": {"type": "project", "text": "legacy portfolio chunk"}}
+    (tmp_path / LEXICAL_FILE).write_text(json.dumps(legacy) + "\n")
+    index = LexicalIndex.load(str(tmp_path))
+    assert [doc.id for doc in index.search("legacy")] == ["old"]
+
+
+def test_merging_replaces_and_deletes_records(tmp_path):
+    build(tmp_path)
+    writer = LexicalIndexWriter(str(tmp_path), merge_existing=True)
+    writer.add("s3", "S3 Mobile now also supports Cloudflare R2.", CHUNKS["s3"][1])
+    writer.close(delete_ids=["cv"])
+
+    index = LexicalIndex.load(str(tmp_path))
+    assert sorted(index.ids) == ["kairos", "s3"]
+    assert [doc.id for doc in index.search("cloudflare")] == ["s3"]
+
+
+def test_missing_index_loads_empty(tmp_path):
+    index = LexicalIndex.load(str(tmp_path))
+    assert len(index) == 0
+    assert index.search("anything") == []
@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+
+from retrieval import reciprocal_rank_fusion
+
+
+def doc(doc_id, text=""):
+    return Document(id=doc_id, page_content=text or doc_id)
+
+
+def ids(docs):
+    return [d.id for d in docs]
+
+
+def test_single_ranking_keeps_its_order():
+    assert ids(reciprocal_rank_fusion([[doc("a"), doc("b"), doc("c")]])) == ["a", "b", "c"]
+
+
+def test_documents_in_both_rankings_rise():
+    vector = [doc("a"), doc("b"), doc("c")]
+    lexical = [doc("c"), doc("d")]
+    # b and d tie on second place; ties keep the order they were first seen in
+    assert ids(reciprocal_rank_fusion([vector, lexical])) == ["c", "a", "b", "d"]
+
+
+def test_scores_follow_the_rank_constant():
+    # With c=0 a first place (1/1) outweighs a second and a third place together (1/2 + 1/3)
+    rankings = [[doc("a"), doc("b")], [doc("x"), doc("y"), doc("b")]]
+    assert ids(reciprocal_rank_fusion(rankings, c=0))[:2] == ["a", "x"]
+    assert ids(reciprocal_rank_fusion(rankings, c=60))[0] == "b"
+
+
+def test_first_rankings_copy_is_kept():
+    hydrated = Document(id="a", page_content="full text", metadata={"source": "vector"})
+    bare = Document(id="a", page_content="", metadata={"source": "lexical"})
+    fused = reciprocal_rank_fusion([[hydrated], [bare]])
+    assert fused == [hydrated]
+
+
+def test_documents_without_ids_are_matched_by_text():
+    fused = reciprocal_rank_fusion([[Document(page_content="same")], [Document(page_content="same")]])
+    assert len(fused) == 1
+
+
+def test_empty_rankings():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
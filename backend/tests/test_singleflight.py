@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class Upstream:
+    """An event stream that waits for `release` before finishing and records how it ended"""
+
+    def __init__(self, count=3):
+        self.count = count
+        self.release = asyncio.Event()
+        self.started = False
+        self.cancelled = False
+
+    async def events(self):
+        self.started = True
+        try:
+            for i in range(self.count):
+                yield {"event": "update", "data": str(i)}
+                await asyncio.sleep(0)
+            await self.release.wait()
+            yield {"event": "done", "data": ""}
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def drain(stream):
+    return [event async for event in stream]
+
+
+def test_followers_get_the_leaders_events():
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream()
+        leader = flights.lead("q", upstream.events())
+        leading = asyncio.ensure_future(drain(leader))
+        await asyncio.sleep(0.01)
+
+        follower = flights.join("q")
+        following = asyncio.ensure_future(drain(follower))
+        await asyncio.sleep(0.01)
+        upstream.release.set()
+        return await leading, await following, "q" in flights
+
+    leader_events, follower_events, in_flight = asyncio.run(run())
+    assert leader_events == follower_events
+    assert [event["data"] for event in leader_events] == ["0", "1", "2", ""]
+    assert not in_flight
+
+
+def test_join_without_a_flight_returns_none():
+    assert SingleFlight().join("q") is None
+
+
+def test_run_continues_while_any_subscriber_is_left():
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream()
+        leader = flights.lead("q", upstream.events())
+        follower = flights.join("q")
+        following = asyncio.ensure_future(drain(follower))
+        await leader.__anext__()
+        await leader.aclose()
+        await asyncio.sleep(0.01)
+        upstream.release.set()
+        return await following, upstream.cancelled
+
+    events, cancelled = asyncio.run(run())
+    assert events[-1]["event"] == "done"
+    assert not cancelled
+
+
+def test_run_is_cancelled_when_every_subscriber_leaves():
+    done = []
+
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream()
+        leader = flights.lead("q", upstream.events(), on_done=lambda: done.append(True))
+        follower = flights.join("q")
+        await leader.__anext__()
+        await leader.aclose()
+        await follower.aclose()
+        await asyncio.sleep(0.01)
+        return upstream.cancelled, "q" in flights
+
+    cancelled, in_flight = asyncio.run(run())
+    assert cancelled
+    assert not in_flight
+    assert done == [True]
+
+
+def test_cancelled_subscriber_leaves():
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream()
+        reading = asyncio.ensure_future(drain(flights.lead("q", upstream.events())))
+        await asyncio.sleep(0.01)
+        reading.cancel()
+        await asyncio.gather(reading, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return upstream.cancelled, len(flights)
+
+    assert asyncio.run(run()) == (True, 0)
+
+
+def test_subscriber_closed_before_reading_still_leaves():
+    done = []
+
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream()
+        leader = flights.lead("q", upstream.events(), on_done=lambda: done.append(True))
+        await leader.aclose()
+        await asyncio.sleep(0.01)
+        return len(flights)
+
+    assert asyncio.run(run()) == 0
+    # Cancelled before it started, but the run still finished and released its resources
+    assert done == [True]
+
+
+def test_errors_reach_every_subscriber():
+    async def failing():
+        yield {"event": "update", "data": "0"}
+        raise RuntimeError("boom")
+
+    async def run():
+        flights = SingleFlight()
+        leader = flights.lead("q", failing())
+        follower = flights.join("q")
+        results = await asyncio.gather(drain(leader), drain(follower), return_exceptions=True)
+        return results, len(flights)
+
+    results, in_flight = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert in_flight == 0
+
+
+def test_key_is_free_once_the_run_finishes():
+    async def run():
+        flights = SingleFlight()
+        first = Upstream(count=1)
+        first.release.set()
+        await drain(flights.lead("q", first.events()))
+        return flights.join("q")
+
+    assert asyncio.run(run()) is None
+
+
+@pytest.mark.parametrize("count", [0, 5])
+def test_late_followers_get_buffered_events_replayed(count):
+    async def run():
+        flights = SingleFlight()
+        upstream = Upstream(count=count)
+        leading = asyncio.ensure_future(drain(flights.lead("q", upstream.events())))
+        await asyncio.sleep(0.01)
+        following = asyncio.ensure_future(drain(flights.join("q")))
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await leading, await following
+
+    leader_events, follower_events = asyncio.run(run())
+    assert follower_events == leader_events
+    assert len(follower_events) == count + 1
@@ -0,0 +1,139 @@
+import asyncio
+import inspect
+import signal
+
+import pytest
+from sse_starlette.sse import AppStatus, EventSourceResponse
+from uvicorn.config import Config
+from uvicorn.main import Server
+
+import streaming
+from streaming import DrainingEventSourceResponse, coalesce_deltas
+
+
+@pytest.fixture(autouse=True)
+def reset_shutdown(monkeypatch):
+    monkeypatch.setattr(streaming, "_shutting_down", False)
+    monkeypatch.setattr(streaming, "_shutdown_event", None)
+    monkeypatch.setattr(streaming, "_shutdown_loop", None)
+    monkeypatch.setattr(AppStatus, "should_exit", False)
+
+
+async def deltas(pieces, delay=0.0, error=None):
+    for piece in pieces:
+        yield piece
+        if delay:
+            await asyncio.sleep(delay)
+    if error is not None:
+        raise error
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_coalescing_disabled_passes_deltas_through():
+    pieces = ["a", "b", "c"]
+    assert asyncio.run(collect(coalesce_deltas(deltas(pieces)))) == pieces
+
+
+def test_first_delta_is_not_held_back():
+    pieces = ["first"] + ["x"] * 9
+    merged = asyncio.run(collect(coalesce_deltas(deltas(pieces, delay=0.005), max_chars=1000)))
+    assert merged == ["first", "x" * 9]
+
+
+def test_deltas_are_flushed_at_max_chars():
+    pieces = ["a"] + ["bc"] * 6
+    merged = asyncio.run(collect(coalesce_deltas(deltas(pieces, delay=0.001), max_chars=4)))
+    assert "".join(merged) == "".join(pieces)
+    assert merged[0] == "a"
+    assert all(len(text) >= 4 for text in merged[1:-1])
+
+
+def test_deltas_are_flushed_after_max_delay():
+    pieces = ["a"] + ["b"] * 10
+    merged = asyncio.run(collect(coalesce_deltas(deltas(pieces, delay=0.02), max_delay=0.05)))
+    assert "".join(merged) == "".join(pieces)
+    assert 2 < len(merged) < len(pieces)
+
+
+def test_source_errors_are_raised_after_flushing():
+    async def run():
+        received = []
+        with pytest.raises(RuntimeError):
+            async for text in coalesce_deltas(deltas(["a", "b", "c"], error=RuntimeError("boom")), max_chars=100):
+                received.append(text)
+        return received
+
+    assert "".join(asyncio.run(run())) == "abc"
+
+
+def test_closing_early_stops_the_source():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                yield "x"
+                await asyncio.sleep(0.001)
+        finally:
+            closed.set()
+
+    async def run():
+        stream = coalesce_deltas(endless(), max_chars=5)
+        await stream.__anext__()
+        await stream.__anext__()
+        await stream.aclose()
+        return closed.is_set()
+
+    assert asyncio.run(run())
+
+
+async def numbers(count, delay, shutdown_after=None):
+    for i in range(count):
+        if i == shutdown_after:
+            # What SIGTERM does: uvicorn's exit handler, with sse_starlette's and ours chained on
+            Server(Config(app=None)).handle_exit(signal.SIGTERM, None)
+        yield {"event": "update", "data": str(i)}
+        await asyncio.sleep(delay)
+
+
+async def stream(response):
+    """Run an SSE response against a client that never disconnects, returning the data lines sent"""
+    body = []
+    never = asyncio.Event()
+
+    async def receive():
+        await never.wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b"").decode())
+
+    await response({"type": "http", "method": "GET", "path": "/"}, receive, send)
+    return [line for line in "".join(body).splitlines() if line.startswith("data:")]
+
+
+def test_stream_keeps_going_after_shutdown_is_requested():
+    response = DrainingEventSourceResponse(numbers(5, 0.01, shutdown_after=1), drain_timeout=5)
+    lines = asyncio.run(stream(response))
+    assert lines == [f"data: {i}" for i in range(5)]
+
+
+def test_stream_is_closed_once_the_drain_timeout_passes():
+    response = DrainingEventSourceResponse(numbers(100, 0.01, shutdown_after=1), drain_timeout=0.1)
+    lines = asyncio.run(asyncio.wait_for(stream(response), 5))
+    assert 2 <= len(lines) < 100
+
+
+def test_uvicorn_exit_handler_requests_shutdown():
+    server = Server(Config(app=None))
+    server.handle_exit(signal.SIGTERM, None)
+    assert streaming.is_shutting_down()
+    assert server.should_exit
+
+
+def test_event_source_response_still_listens_for_exit_signal():
+    # DrainingEventSourceResponse overrides this private hook; fail loudly if an upgrade renames it
+    assert "_listen_for_exit_signal" in inspect.getsource(EventSourceResponse.__call__)
@@ -0,0 +1,62 @@
+from url_index import ProjectUrlIndex, StreamingUrlVerifier
+
+CATALOG = {"s3-mobile": "https://s3.example.com", "FindKairos": "https://findkairos.com"}
+
+
+def verify(url_index, deltas, project_urls):
+    verifier = StreamingUrlVerifier(url_index)
+    verifier.track(project_urls)
+    for delta in deltas:
+        verifier.feed(delta)
+    return verifier.missing()
+
+
+def test_mentions_without_their_url_are_reported():
+    index = ProjectUrlIndex(CATALOG)
+    answer = ["I built s3-mobile", " and FindKairos (https://findkairos.com)."]
+    assert verify(index, answer, CATALOG) == [("s3-mobile", "https://s3.example.com")]
+
+
+def test_names_split_across_deltas_are_found():
+    index = ProjectUrlIndex(CATALOG)
+    assert verify(index, ["Find", "Kai", "ros is a scheduler"], CATALOG) == [("FindKairos", "https://findkairos.com")]
+
+
+def test_only_tracked_projects_are_reported():
+    index = ProjectUrlIndex(CATALOG)
+    assert verify(index, ["s3-mobile and findkairos"], {"FindKairos": CATALOG["FindKairos"]}) == [
+        ("FindKairos", "https://findkairos.com")
+    ]
+
+
+def test_projects_retrieved_mid_answer_rescan_the_text_so_far():
+    index = ProjectUrlIndex(CATALOG)
+    verifier = StreamingUrlVerifier(index)
+    verifier.track(CATALOG)
+    verifier.feed("Portfolio Chat answers questions")
+    verifier.track({"Portfolio Chat": "https://chat.example.com"})
+    verifier.feed(" about my work.")
+    assert verifier.missing() == [("Portfolio Chat", "https://chat.example.com")]
+
+
+def test_retrieved_projects_do_not_change_the_shared_index():
+    index = ProjectUrlIndex(CATALOG)
+    automaton = index.automaton
+    verify(index, ["Portfolio Chat"], {"Portfolio Chat": "https://chat.example.com"})
+    assert index.projects == CATALOG
+    assert index.automaton is automaton
+
+
+def test_update_rebuilds_only_on_change():
+    index = ProjectUrlIndex(CATALOG)
+    automaton = index.automaton
+    assert not index.update({"s3-mobile": "https://s3.example.com"})
+    assert index.automaton is automaton
+    assert index.update({"new": "https://new.example.com"})
+    assert len(index) == 3
+
+
+def test_save_and_load(tmp_path):
+    ProjectUrlIndex(CATALOG).save(str(tmp_path))
+    assert ProjectUrlIndex.load(str(tmp_path)).projects == CATALOG
+    assert len(ProjectUrlIndex.load(str(tmp_path / "missing"))) == 0
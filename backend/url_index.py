@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_FILE = "projects.json"
+
+# Match labels: a project's name or its URL was seen
+NAME = "name"
+URL = "url"
+
+
+def project_url(metadata: Mapping) -> Optional[Tuple[str, str]]:
+    """(project name, live URL) for a document's metadata, or None if it has no live URL"""
+    live_url = metadata.get("live_url")
+    # Skip if live_url is missing, empty or the literal string "null"
+    if not isinstance(live_url, str) or not live_url.strip() or live_url.lower() == "null":
+        return None
+
+    project_name = metadata.get("name") or metadata.get("file_name", "").replace(".md", "")
+    return project_name, live_url
+
+
+def extract_project_urls(docs: Iterable) -> Dict[str, str]:
+    """
+    Collect project live URLs from document metadata.
+    Returns a dict of {project_name: url}
+    """
+    project_urls = {}
+    for doc in docs:
+        entry = project_url(doc.metadata)
+        if entry:
+            project_urls[entry[0]] = entry[1]
+    return project_urls
+
+
+def name_variants(project: str) -> Set[str]:
+    """Lower-cased spellings of a project name that count as a mention"""
+    name = project.lower()
+    variants = {name, name.replace("_", ""), name.replace("-", ""), name.replace(".md", "")}
+    return {variant for variant in variants if variant}
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting which patterns occur in a text in one pass"""
+
+    def __init__(self, patterns: Mapping[str, Hashable]):
+        # goto[state] maps a character to the next state; out[state] holds the
+        # labels of every pattern ending at that state (including via fail links)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Set[str]] = [set()]
+
+        for pattern, label in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].add(label)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                # Depth-one states fall back to the root, not to themselves
+                self.fail[child] = target if target != child else 0
+                self.out[child] |= self.out[self.fail[child]]
+
+    def step(self, state: int, text: str, found: Set) -> int:
+        """
+        Advance from `state` over `text`, adding the labels of patterns that
+        end inside it to `found`. Returns the new state, so a text that
+        arrives in pieces can be scanned piece by piece.
+        """
+        goto, fail, out = self.goto, self.fail, self.out
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return state
+
+
+class ProjectUrlIndex:
+    """
+    Project name -> live URL catalog with a precomputed name matcher.
+
+    Built once from the projects.json written by scripts/build_pinecone.py,
+    so finding which projects a response mentions is a single automaton
+    pass over the text rather than a substring scan per project and
+    spelling variant. The automaton also matches each project's URL, which
+    lets `StreamingUrlVerifier` check an answer as it streams.
+    """
+
+    def __init__(self, projects: Optional[Mapping[str, str]] = None):
+        self._lock = threading.Lock()
+        self.projects: Dict[str, str] = dict(projects or {})
+        self._automaton = self._build(self.projects)
+
+    @staticmethod
+    def _build(projects: Mapping[str, str]) -> _Automaton:
+        patterns = {url.lower(): (URL, project) for project, url in projects.items()}
+        for project in projects:
+            for variant in name_variants(project):
+                patterns[variant] = (NAME, project)
+        return _Automaton(patterns)
+
+    @property
+    def automaton(self) -> _Automaton:
+        return self._automaton
+
+    @classmethod
+    def load(cls, index_dir: str) -> "ProjectUrlIndex":
+        path = Path(index_dir) / PROJECTS_FILE
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                projects = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No {PROJECTS_FILE} in {index_dir}, only retrieved project URLs will be checked")
+            projects = {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load project URLs from {path}: {e}")
+            projects = {}
+        return cls(projects)
+
+    def save(self, index_dir: str) -> None:
+        """Write the catalog to INDEX_DIR/projects.json (atomically)"""
+        path = Path(index_dir) / PROJECTS_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(self.projects.items())), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def update(self, projects: Mapping[str, str]) -> bool:
+        """Add or change projects, rebuilding the matcher only if something changed"""
+        if all(self.projects.get(name) == url for name, url in projects.items()):
+            return False
+        with self._lock:
+            merged = {**self.projects, **projects}
+            self._automaton = self._build(merged)
+            self.projects = merged
+        return True
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+
+class StreamingUrlVerifier:
+    """
+    Checks a streamed answer for project mentions that lack their URL.
+
+    Each delta is fed through the URL index automaton once, carrying the
+    match state across deltas, so a name split over two deltas is still
+    found and the total work is linear in the answer length. `missing()`
+    is then answered from the recorded matches without rescanning the text.
+    Only projects passed to `track()` (the ones retrieved for this answer)
+    are reported. The shared URL index is never modified: retrieved
+    projects it doesn't know are matched with this verifier's own copy.
+    """
+
+    def __init__(self, url_index: ProjectUrlIndex):
+        self.url_index = url_index
+        self.project_urls: Dict[str, str] = {}
+        self.mentioned: Set[str] = set()
+        self.linked: Set[str] = set()
+        self._catalog = url_index
+        self._automaton = url_index.automaton
+        self._state = 0
+        self._parts: List[str] = []
+
+    def track(self, project_urls: Mapping[str, str]) -> None:
+        """Add projects whose URLs the answer should include"""
+        self.project_urls.update(project_urls)
+        if any(self._catalog.projects.get(name) != url for name, url in project_urls.items()):
+            self._catalog = ProjectUrlIndex({**self._catalog.projects, **project_urls})
+
+    def feed(self, delta: str) -> None:
+        self._parts.append(delta)
+        if self._catalog.automaton is not self._automaton:
+            # New projects were retrieved mid-answer: scan what has been
+            # streamed so far with the new automaton, once
+            self._automaton = self._catalog.automaton
+            self._state = 0
+            self.mentioned.clear()
+            self.linked.clear()
+            delta = "".join(self._parts)
+
+        found: Set[Tuple[str, str]] = set()
+        self._state = self._automaton.step(self._state, delta.lower(), found)
+        for kind, project in found:
+            (self.mentioned if kind == NAME else self.linked).add(project)
+
+    def missing(self) -> List[Tuple[str, str]]:
+        """(project, url) pairs mentioned so far without their URL, in retrieval order"""
+        return [
+            (project, url)
+            for project, url in self.project_urls.items()
+            if project in self.mentioned and project not in self.linked
+        ]
@@ -118,6 +118,7 @@ export function ChatInterface({ toggleSidebar }: ChatInterfaceProps) {
       let textQueue = ""; // Queue for text to be displayed
       let isDisplaying = false;
       let firstChunkReceived = false;
+      let eventType = ""; // Type of the SSE event being read
 
       // Function to display queued text with delay
       const displayQueuedText = async () => {
@@ -164,8 +165,12 @@ export function ChatInterface({ toggleSidebar }: ChatInterfaceProps) {
         buffer = lines.pop() || "";
 
         for (const line of lines) {
-          if (line.startsWith("data:")) {
+          if (line.startsWith("event:")) {
+            eventType = line.slice(6).trim();
+          } else if (line.startsWith("data:")) {
             const data = line.slice(5).trim();
+            // "busy" events report our place in the server's queue; keep showing the loader
+            if (eventType === "busy") continue;
             if (data) {
               // Turn off waiting state when first chunk arrives
               if (!firstChunkReceived) {